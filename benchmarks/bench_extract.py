@@ -0,0 +1,84 @@
+"""
+Benchmark UoCData.extract_all against per-section XPath scans
+
+Run from the project root:
+    python -m benchmarks.bench_extract
+"""
+import re
+import timeit
+
+from src.uoc_scraper import UoCData
+from src.utils import namespaces
+
+from .fixtures import make_unit_xml
+
+SIZES = [
+    # (elements, criteria per element, filler topics)
+    (5, 4, 40),
+    (50, 10, 400),
+    (200, 25, 2000),
+]
+
+
+def legacy_extract_all(uoc: UoCData) -> dict:
+    """Extraction as it was done before the single-pass engine, for comparison"""
+    root = uoc.root
+
+    def topic(title):
+        return root.xpath(f'.//a:Topic[.//a:Description[text()="{title}"]]', namespaces=namespaces)[0]
+
+    def text(node, xpath):
+        return node.xpath(xpath, namespaces=namespaces)
+
+    elements = []
+    for row in text(topic("Elements and Performance Criteria"), './a:Text/a:table/a:tr[position() > 2]'):
+        index, title = re.split(r'\.\s*', text(row, './a:td[1]/a:p/text()')[0], maxsplit=1)
+        pcs = [dict(zip(('index', 'description'), pc.split(' ', 1)))
+               for pc in text(row, './a:td[2]/a:p/text()')]
+        elements.append({'index': index, 'title': title, 'performance_criteria': pcs})
+
+    skills = []
+    for row in text(topic("Foundation Skills"), './a:Text/a:table/a:tr[position() > 1]'):
+        refs = []
+        if text(row, './a:td[2]') != text(row, './a:td[last()]'):
+            refs = text(row, './a:td[2]/a:p/text()')[0].split(', ')
+        skills.append({'skill': text(row, './a:td[1]/a:p/text()')[0], 'performance_criteria': refs,
+                       'descriptions': text(row, './a:td[last()]/a:p/text()')})
+
+    return {
+        'unit_code': uoc.unit_code,
+        'unit_title': text(root, './/a:Book[.//a:Description[contains(text(), "Release")]]'
+                                 '//a:VariableAssignments/a:VariableAssignment[./a:Name/text()="Title"]'
+                                 '/a:Value/text()')[0],
+        'elements': elements,
+        'foundational_skills': skills,
+        'performance_evidence': text(topic('Performance Evidence'), './a:Text/a:p/text()'),
+        'knowledge_evidence': text(topic('Knowledge Evidence'), './a:Text/a:p/text()'),
+        'assessment_conditions': text(topic('Assessment Conditions'), './a:Text/a:p/text()'),
+    }
+
+
+def best_of(func, repeat=5) -> float:
+    return min(timeit.repeat(func, number=1, repeat=repeat))
+
+
+def main():
+    print(f"{'elements x criteria':>20} {'topics':>7} {'legacy ms':>10} {'engine ms':>10} {'speedup':>8}")
+    for elements, criteria, fillers in SIZES:
+        content = make_unit_xml("BSBCRT413", elements=elements, criteria=criteria, filler_topics=fillers)
+        uoc = UoCData.from_xml("BSBCRT413", content)
+        assert legacy_extract_all(uoc) == uoc.extract_all()
+
+        def engine_extract_all():
+            # Drop the per-instance memos so every run does the full extraction
+            uoc._topics = uoc._books = uoc._sections = uoc._data = None
+            uoc.extract_all()
+
+        legacy = best_of(lambda: legacy_extract_all(uoc))
+        engine = best_of(engine_extract_all)
+        print(f"{f'{elements} x {criteria}':>20} {fillers + 5:>7} {legacy * 1000:>10.2f} "
+              f"{engine * 1000:>10.2f} {legacy / engine:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,50 @@
+"""
+Benchmark field-selective extraction against extracting every section
+
+Times parsing downloaded XML and extracting from it, as the MCP tools do,
+for all fields and for the small subsets cheap queries ask for.
+
+Run from the project root:
+    python -m benchmarks.bench_fields
+"""
+import timeit
+
+from src.uoc_scraper import UoCData
+
+from .fixtures import make_unit_xml
+
+SIZES = [
+    # (elements, criteria per element, evidence items, filler topics)
+    (5, 4, 6, 40),
+    (50, 10, 50, 400),
+    (200, 25, 200, 2000),
+]
+
+QUERIES = {
+    "all": None,
+    "unit_title": ["unit_title"],
+    "knowledge_evidence": ["knowledge_evidence"],
+}
+
+
+def best_of(func, repeat=5) -> float:
+    return min(timeit.repeat(func, number=1, repeat=repeat))
+
+
+def main():
+    print(f"{'elements x criteria':>20} " + " ".join(f"{name + ' ms':>22}" for name in QUERIES))
+    for elements, criteria, evidence, fillers in SIZES:
+        content = make_unit_xml("BSBCRT413", elements=elements, criteria=criteria,
+                                evidence=evidence, filler_topics=fillers)
+        full = UoCData.from_xml("BSBCRT413", content).extract_all()
+
+        timings = []
+        for fields in QUERIES.values():
+            data = UoCData.from_xml("BSBCRT413", content, fields=fields).extract(fields)
+            assert data == {field: full[field] for field in fields or full}
+            timings.append(best_of(lambda: UoCData.from_xml("BSBCRT413", content, fields=fields).extract(fields)))
+        print(f"{f'{elements} x {criteria}':>20} " + " ".join(f"{t * 1000:>22.2f}" for t in timings))
+
+
+if __name__ == "__main__":
+    main()
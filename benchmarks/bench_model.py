@@ -0,0 +1,77 @@
+"""
+Benchmark the slotted unit model against plain extract_all dicts
+
+Compares memory held by many units, and serialization of the dicts as
+compact JSON against the model's positional compact form. Both sides use the
+same separators, so the difference is only the repeated key names.
+
+Run from the project root:
+    python -m benchmarks.bench_model
+"""
+import json
+import timeit
+import tracemalloc
+
+from src.models import Unit
+from src.uoc_scraper import UoCData
+
+from .fixtures import make_unit_xml
+
+UNIT_COUNTS = [100, 1000, 5000]
+
+
+def make_units(count: int) -> list:
+    """Extracted data of ``count`` distinct units of typical size"""
+    template = UoCData.from_xml("BENMOD001", make_unit_xml(
+        "BENMOD001", elements=6, criteria=4, evidence=10, filler_topics=0)).extract_all()
+    # Round trip through JSON so no strings are shared between units, as when loaded from disk
+    text = json.dumps(template)
+    return [json.loads(text.replace("BENMOD001", f"BENMOD{i % 1000:03d}")) for i in range(count)]
+
+
+def dumps_dict(data: dict) -> str:
+    """Serialize a dict as compact JSON, with the same settings as Unit.dumps"""
+    return json.dumps(data, separators=(',', ':'), ensure_ascii=False)
+
+
+def traced_size(build) -> int:
+    """Bytes of Python memory still held by the result of build()"""
+    tracemalloc.start()
+    try:
+        result = build()
+        size, _ = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    del result
+    return size
+
+
+def best(func, repeat: int = 3) -> float:
+    return min(timeit.repeat(func, number=1, repeat=repeat))
+
+
+def main():
+    print(f"{'units':>6} {'dict KiB':>9} {'model KiB':>10} "
+          f"{'dump ms':>8} {'compact ms':>11} {'load ms':>8} {'compact ms':>11} {'size':>7}")
+    for count in UNIT_COUNTS:
+        dicts = make_units(count)
+        dumped = [dumps_dict(d) for d in dicts]
+        units = [Unit.from_dict(d) for d in dicts]
+        compact = [u.dumps() for u in units]
+
+        dict_size = traced_size(lambda: [json.loads(text) for text in dumped])
+        model_size = traced_size(lambda: [Unit.loads(text) for text in compact])
+
+        dump = best(lambda: [dumps_dict(d) for d in dicts])
+        dump_compact = best(lambda: [u.dumps() for u in units])
+        load = best(lambda: [json.loads(text) for text in dumped])
+        load_compact = best(lambda: [Unit.loads(text) for text in compact])
+        ratio = sum(map(len, compact)) / sum(map(len, dumped))
+
+        print(f"{count:>6} {dict_size // 1024:>9} {model_size // 1024:>10} "
+              f"{dump * 1000:>8.1f} {dump_compact * 1000:>11.1f} "
+              f"{load * 1000:>8.1f} {load_compact * 1000:>11.1f} {ratio:>6.0%}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+"""
+Benchmark cold start of the command line tool and MCP server with -X importtime
+
+Each scenario runs in a fresh interpreter. The total import time is the sum
+of the cumulative times of top-level imports, and heavy dependencies that a
+scenario should never load are reported by name.
+
+Run from the project root:
+    python -m benchmarks.bench_startup            # report import times
+    python -m benchmarks.bench_startup --check    # exit 1 if a budget is exceeded
+"""
+import argparse
+import os
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Dependencies only the fetching, rendering and template download paths need
+HEAVY_MODULES = {"requests", "requests_ntlm", "bs4", "docx", "docxtpl", "lxml"}
+
+# name: (interpreter arguments, import time budget in ms)
+SCENARIOS = {
+    "cli_help": (["uoc_create.py", "--help"], 250),
+    "cli_import": (["-c", "import uoc_create"], 250),
+    # FastMCP itself accounts for most of this
+    "mcp_server_import": (["-c", "import mcp_server"], 4000),
+}
+
+
+def import_times(args: list) -> tuple:
+    """
+    Run the interpreter with -X importtime
+
+    Returns:
+        Total milliseconds spent in top-level imports other than site, and the names of all modules imported
+    """
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime"] + args,
+        cwd=ROOT, capture_output=True, text=True, check=True,
+    )
+    total_us, modules = 0, set()
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        modules.add(name.strip())
+        # Top-level imports are the ones not indented under another; site runs before any scenario code
+        if not name.startswith("  ") and name.strip() != "site":
+            total_us += int(cumulative)
+    return total_us / 1000, modules
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark cold start import time")
+    parser.add_argument("--repeat", type=int, default=5, help="Runs per scenario (best is kept)")
+    parser.add_argument("--check", action="store_true", help="Exit with status 1 when a budget is exceeded")
+    args = parser.parse_args()
+
+    failures = []
+    print(f"{'scenario':<20} {'import ms':>10} {'budget ms':>10}  heavy modules loaded")
+    for name, (scenario_args, budget) in SCENARIOS.items():
+        runs = [import_times(scenario_args) for _ in range(args.repeat)]
+        best = min(total for total, _ in runs)
+        heavy = sorted(HEAVY_MODULES & runs[0][1])
+        over = best > budget
+        if over or heavy:
+            failures.append(name)
+        flag = "  <-- over budget" if over else ""
+        print(f"{name:<20} {best:>10.1f} {budget:>10}  {', '.join(heavy) or '-'}{flag}")
+
+    if failures:
+        print(f"Startup regressions: {', '.join(failures)}", file=sys.stderr)
+        if args.check:
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
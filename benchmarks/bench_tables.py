@@ -0,0 +1,99 @@
+"""
+Benchmark the bulk OOXML table writer against row-by-row python-docx filling
+
+Run from the project root:
+    python -m benchmarks.bench_tables
+"""
+import os
+import timeit
+
+from src.table_writer import fill_table, grouped_rows
+from src.template_registry import registry
+from src.utils import FileNames, Paths
+
+ROW_COUNTS = [10, 100, 1000]
+TEMPLATE_PATH = os.path.join(Paths.Jinja_Templates, FileNames.Assessment_Mapping)
+
+
+def make_uoc_data(rows: int) -> dict:
+    """Unit data giving roughly ``rows`` rows in each table"""
+    per_group = 10 if rows >= 10 else rows
+    groups = max(1, rows // per_group)
+    items = [f"Evidence item {i}" for i in range(rows)]
+    return {
+        'elements': [
+            {'index': str(e), 'title': f"Element {e}",
+             'performance_criteria': [{'index': f"{e}.{c}", 'description': f"Criterion {c}"}
+                                      for c in range(1, per_group + 1)]}
+            for e in range(1, groups + 1)
+        ],
+        'foundational_skills': [
+            {'skill': f"Skill {s}", 'performance_criteria': [],
+             'descriptions': [f"Description {d}" for d in range(per_group)]}
+            for s in range(groups)
+        ],
+        'performance_evidence': items,
+        'knowledge_evidence': items,
+        'assessment_conditions': items,
+    }
+
+
+def legacy_fill(doc, uoc_data):
+    """Table filling as it was done before the bulk writer, for comparison"""
+    def clear(table):
+        for row in range(len(table.rows) - 1, 1, -1):
+            table._tbl.remove(table.rows[row]._tr)
+
+    def grouped(table, groups):
+        clear(table)
+        row = 2
+        for label, items in groups:
+            start_row = row
+            for item in items:
+                table.add_row().cells[1].text = item
+            table.rows[start_row].cells[0].text = label
+            if start_row != row:
+                table.rows[start_row].cells[0].merge(table.rows[row].cells[0])
+            row += len(items)
+
+    grouped(doc.tables[1], [(f"{e['index']}. {e['title']}",
+                             [f"{pc['index']} {pc['description']}" for pc in e['performance_criteria']])
+                            for e in uoc_data['elements']])
+    grouped(doc.tables[2], [(s['skill'], s['descriptions']) for s in uoc_data['foundational_skills']])
+    for index, key in ((4, 'performance_evidence'), (5, 'knowledge_evidence'), (6, 'assessment_conditions')):
+        clear(doc.tables[index])
+        for item in uoc_data[key]:
+            doc.tables[index].add_row().cells[0].text = item
+
+
+def bulk_fill(doc, uoc_data):
+    fill_table(doc.tables[1], grouped_rows(
+        (f"{e['index']}. {e['title']}", [f"{pc['index']} {pc['description']}" for pc in e['performance_criteria']])
+        for e in uoc_data['elements']
+    ))
+    fill_table(doc.tables[2], grouped_rows((s['skill'], s['descriptions']) for s in uoc_data['foundational_skills']))
+    for index, key in ((4, 'performance_evidence'), (5, 'knowledge_evidence'), (6, 'assessment_conditions')):
+        fill_table(doc.tables[index], ((item,) for item in uoc_data[key]))
+
+
+def time_fill(fill, uoc_data, repeat: int) -> float:
+    """Best time of filling a fresh copy of the template, excluding the copy itself"""
+    timings = []
+    for _ in range(repeat):
+        doc = registry.document(TEMPLATE_PATH)
+        timings.append(timeit.timeit(lambda: fill(doc, uoc_data), number=1))
+    return min(timings)
+
+
+def main():
+    print(f"{'rows':>6} {'legacy ms':>10} {'bulk ms':>10} {'speedup':>8}")
+    for rows in ROW_COUNTS:
+        uoc_data = make_uoc_data(rows)
+        repeat = 1 if rows >= 1000 else 3
+        legacy = time_fill(legacy_fill, uoc_data, repeat)
+        bulk = time_fill(bulk_fill, uoc_data, repeat)
+        print(f"{rows:>6} {legacy * 1000:>10.1f} {bulk * 1000:>10.1f} {legacy / bulk:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
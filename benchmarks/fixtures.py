@@ -0,0 +1,77 @@
+"""
+Synthetic training.gov.au unit XML for offline benchmarks
+"""
+from xml.sax.saxutils import escape
+
+from src.utils import namespaces
+
+
+def _topic(description: str, text: str) -> str:
+    return (
+        f"<Topic><Object><Description>{escape(description)}</Description></Object>"
+        f"<Text>{text}</Text></Topic>"
+    )
+
+
+def _paragraphs(items) -> str:
+    return "".join(f"<p>{escape(item)}</p>" for item in items)
+
+
+def make_unit_xml(unit_code: str, elements: int = 5, criteria: int = 4, skills: int = 4,
+                  evidence: int = 6, filler_topics: int = 40) -> bytes:
+    """
+    Build an Authorit unit export shaped like training.gov.au's *_Complete_R1.xml
+
+    Args:
+        unit_code: Unit code to embed
+        elements: Number of elements
+        criteria: Performance criteria per element
+        skills: Number of foundation skills
+        evidence: Items in each evidence and conditions section
+        filler_topics: Unused Topics standing in for the Book metadata real exports carry
+    """
+    element_rows = "".join(
+        f"<tr><td><p>{e}. Element {e} of {unit_code}</p></td><td>"
+        + _paragraphs(f"{e}.{c} Perform task {c} for element {e} to the required standard"
+                      for c in range(1, criteria + 1))
+        + "</td></tr>"
+        for e in range(1, elements + 1)
+    )
+    skill_rows = "".join(
+        f"<tr><td><p>Skill {s}</p></td>"
+        + (f"<td><p>1.{s}, 2.{s}</p></td>" if s % 2 else "")
+        + f"<td>{_paragraphs(f'Description {d} of skill {s}' for d in range(1, 3))}</td></tr>"
+        for s in range(1, skills + 1)
+    )
+    fillers = [
+        _topic(f"Supplementary topic {t}", _paragraphs(f"Filler text {t}.{p}" for p in range(10)))
+        for t in range(filler_topics)
+    ]
+    xml = (
+        '<?xml version="1.0" encoding="utf-8"?>'
+        f'<AuthoritExport xmlns="{namespaces["a"]}" xmlns:xsi="{namespaces["xsi"]}"><Objects>'
+        f"<Book><Object><Description>{unit_code} Release 1</Description></Object>"
+        "<VariableAssignments>"
+        f"<VariableAssignment><Name>Code</Name><Value>{unit_code}</Value></VariableAssignment>"
+        f"<VariableAssignment><Name>Title</Name><Value>Synthetic unit {unit_code}</Value></VariableAssignment>"
+        "</VariableAssignments></Book>"
+        + "".join(fillers[: filler_topics // 2])
+        + _topic(
+            "Elements and Performance Criteria",
+            "<table><tr><td><p>ELEMENTS</p></td><td><p>PERFORMANCE CRITERIA</p></td></tr>"
+            "<tr><td><p>Elements describe the essential outcomes</p></td>"
+            "<td><p>Performance criteria describe the performance needed</p></td></tr>"
+            + element_rows + "</table>",
+        )
+        + _topic(
+            "Foundation Skills",
+            "<table><tr><td><p>Skill</p></td><td><p>Performance Criteria</p></td>"
+            "<td><p>Description</p></td></tr>" + skill_rows + "</table>",
+        )
+        + _topic("Performance Evidence", _paragraphs(f"Performance evidence {i}" for i in range(evidence)))
+        + _topic("Knowledge Evidence", _paragraphs(f"Knowledge evidence {i}" for i in range(evidence)))
+        + _topic("Assessment Conditions", _paragraphs(f"Assessment condition {i}" for i in range(evidence)))
+        + "".join(fillers[filler_topics // 2:])
+        + "</Objects></AuthoritExport>"
+    )
+    return xml.encode("utf-8")
@@ -0,0 +1,43 @@
+"""
+Record unit exports from training.gov.au into benchmarks/data/
+
+Recorded exports are served by the stand-in server in place of synthetic
+units, and benchmarks.run times every stage on each of them as well.
+
+Run from the project root (needs access to training.gov.au):
+    python -m benchmarks.record BSBCRT413 BSBWHS411
+"""
+import argparse
+import os
+import sys
+
+from src.uoc_scraper import UoCData
+from src.xml_cache import XMLCache
+
+from .server import DATA_DIR
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Record unit exports for the benchmarks")
+    parser.add_argument("unit_codes", nargs="+", metavar="CODE", help="Units to record")
+    args = parser.parse_args()
+
+    status = 0
+    for unit_code in args.unit_codes:
+        try:
+            release = UoCData.releases.latest(unit_code)
+            content = UoCData.fetch_content(unit_code, release, XMLCache(enabled=False))
+        except Exception as e:
+            print(f"[failed] {unit_code}: {e}", file=sys.stderr)
+            status = 1
+            continue
+        # Saved as release 1, the release the suite requests
+        path = os.path.join(DATA_DIR, f"{unit_code}_Complete_R1.xml")
+        with open(path, "wb") as f:
+            f.write(content)
+        print(f"[ok]     {unit_code} R{release}: {len(content) // 1024} KiB")
+    return status
+
+
+if __name__ == "__main__":
+    sys.exit(main())
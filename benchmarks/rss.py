@@ -0,0 +1,51 @@
+"""
+Peak resident set size of one parse stage, measured in a fresh process
+
+benchmarks.run starts this module in a subprocess for each measurement, so
+nothing but the unit scraper is imported and memory freed by earlier work
+cannot hide what the parse needs. Prints the process's peak RSS in KiB.
+
+    python -m benchmarks.rss {none,parse,parse_stream} UNIT_CODE XML_PATH
+"""
+import io
+import sys
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+from src.uoc_scraper import UoCData
+
+STAGES = {
+    "none": lambda unit_code, content: None,
+    "parse": lambda unit_code, content: UoCData.from_xml(unit_code, content),
+    "parse_stream": lambda unit_code, content: UoCData.from_stream(unit_code, io.BytesIO(content)),
+}
+
+
+def peak_rss_kb() -> int:
+    # On Linux ru_maxrss carries over the parent's peak from before exec, so the
+    # peak of this process's own memory is read from /proc where it exists
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1])
+    except OSError:
+        pass
+    usage = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # macOS reports bytes, other systems KiB
+    return usage // 1024 if sys.platform == "darwin" else usage
+
+
+def main():
+    stage, unit_code, path = sys.argv[1:4]
+    with open(path, "rb") as f:
+        content = f.read()
+    STAGES[stage](unit_code, content)
+    print(peak_rss_kb())
+
+
+if __name__ == "__main__":
+    main()
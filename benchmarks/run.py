@@ -0,0 +1,341 @@
+"""
+Offline benchmark suite covering fetch, parse, extract, save and render
+
+Every network call goes to a local stand-in server (benchmarks.server), so the
+suite needs no access to training.gov.au or the VU intranet. Each stage is
+timed separately at several unit sizes and its peak Python memory is measured
+with tracemalloc. tracemalloc cannot see allocations made inside lxml's C code,
+so the parse stages also report how much they raise the peak resident set size
+of a fresh process (on platforms with the resource module).
+
+Run from the project root:
+    python -m benchmarks.run                    # compare against the baseline
+    python -m benchmarks.run --save-baseline    # record a new baseline
+    python -m benchmarks.run --check            # exit 1 on regressions
+"""
+import argparse
+import glob
+import io
+import json
+import os
+import re
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+
+from lxml import etree
+
+import src.template_scraper
+import src.utils
+from src.http_client import HttpClient
+from src.template_preparer import TemplatePreparer
+from src.template_scraper import TemplatesScraper
+from src.uoc_scraper import UoCData
+from src.utils import get_unit_xml_url
+
+from . import rss
+from .fixtures import make_unit_xml
+from .server import DATA_DIR, StandInServer
+
+BASELINE_PATH = os.path.join(os.path.dirname(__file__), "baseline.json")
+
+# Unit code and make_unit_xml arguments per scale
+SCALES = {
+    "small": ("BENSML001", dict(elements=5, criteria=4, evidence=6)),
+    "medium": ("BENMED001", dict(elements=12, criteria=8, evidence=20)),
+    "large": ("BENLRG001", dict(elements=40, criteria=25, evidence=100)),
+    "xlarge": ("BENXLG001", dict(elements=100, criteria=40, evidence=300, filler_topics=2000)),
+}
+
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# A benchmark's recorded run-to-run spread widens its tolerance up to this much, so
+# a noisy stage cannot hide a slowdown larger than it
+MAX_SPREAD_TOLERANCE = 0.5
+
+# Each benchmark is run at least this long (and at least --repeat times) and its best
+# time kept, so fast stages get enough runs for the best to be stable
+MIN_SECONDS = 0.2
+
+# Stages whose peak resident set size is measured in a fresh process, and the scales
+# measured (on smaller documents the difference is within a few hundred KiB of noise)
+RSS_STAGES = ("parse", "parse_stream")
+RSS_SCALES = ("xlarge",)
+
+# Growth in peak RSS, in KiB, below which a change is not reported as a regression
+RSS_FLOOR_KB = 1024
+
+
+def recorded_units() -> list:
+    """Codes of the units recorded in benchmarks/data/ with benchmarks.record"""
+    paths = glob.glob(os.path.join(DATA_DIR, "*_Complete_R1.xml"))
+    return sorted(re.match(r"(.+)_Complete_R1\.xml$", os.path.basename(path)).group(1) for path in paths)
+
+
+def reference_workload():
+    """
+    Small fixed workload of XML parsing, JSON and plain Python, without any project code
+
+    It is run between the runs of every benchmark, and each benchmark is compared
+    with the baseline as a multiple of it, so a faster or slower machine, or a
+    burst of load while one stage runs, does not show as a change.
+    """
+    content = make_unit_xml("BENREF001", elements=3, criteria=3, evidence=3, filler_topics=0)
+    data = [{"index": str(i), "text": "Perform the task to the required standard"} for i in range(100)]
+
+    def run():
+        etree.fromstring(content)
+        json.dumps(data, indent=2)
+        sum(i * i for i in range(5000))
+    return run
+
+
+_reference = reference_workload()
+
+
+def _time(func) -> float:
+    start = time.perf_counter()
+    func()
+    return time.perf_counter() - start
+
+
+def measure(func, repeat: int) -> dict:
+    """
+    Best wall time over at least ``repeat`` runs and MIN_SECONDS, the best time of the
+    reference workload run between them, and peak traced memory of one extra run
+    """
+    timings, reference = [], []
+    while len(timings) < repeat or sum(timings) < MIN_SECONDS:
+        reference.append(_time(_reference))
+        timings.append(_time(func))
+
+    tracemalloc.start()
+    try:
+        func()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return {"seconds": min(timings), "reference": min(reference), "peak_kb": peak // 1024}
+
+
+def measure_rss(stage: str, unit_code: str, content: bytes):
+    """
+    KiB a parse stage adds to the peak RSS of a freshly started process, or None where it cannot be measured
+
+    The peak of a process only ever goes up, so each run gets a new process
+    (benchmarks.rss), and the peak of one that only read the XML is subtracted.
+    """
+    if rss.resource is None:
+        return None
+    with tempfile.TemporaryDirectory() as temp_dir:
+        path = os.path.join(temp_dir, f"{unit_code}.xml")
+        with open(path, "wb") as f:
+            f.write(content)
+        peaks = [
+            int(subprocess.run([sys.executable, "-m", "benchmarks.rss", run_stage, unit_code, path],
+                               cwd=PROJECT_ROOT, capture_output=True, text=True, check=True).stdout)
+            for run_stage in ("none", stage)
+        ]
+    return max(0, peaks[1] - peaks[0])
+
+
+def run_unit_stages(unit_code: str, repeat: int, work_dir: str, rss: bool = False) -> dict:
+    """Time each stage of preparing one unit, and measure the peak RSS of the parse stages if rss is set"""
+    client = HttpClient()
+    url = get_unit_xml_url(unit_code)
+    content = client.get(url).content
+
+    def extract():
+        uoc = UoCData.from_xml(unit_code, content)
+        return uoc.extract_all()
+
+    uoc = UoCData.from_xml(unit_code, content)
+    uoc_data = uoc.extract_all()
+    parsed = UoCData.from_xml(unit_code, content)
+
+    def extract_only():
+        parsed._topics = parsed._books = parsed._sections = parsed._data = None
+        parsed.extract_all()
+
+    preparer = TemplatePreparer(unit_code, uoc_data, {"course_code": "BENCH"})
+    preparer.render_assessment_mapping()  # Warm the template registry
+
+    results = {
+        "fetch": measure(lambda: client.get(url).content, repeat),
+        "parse": measure(lambda: UoCData.from_xml(unit_code, content), repeat),
+        "parse_stream": measure(lambda: UoCData.from_stream(unit_code, io.BytesIO(content)), repeat),
+        "extract": measure(extract_only, repeat),
+        "save_json": measure(lambda: uoc.save_to_file(work_dir), repeat),
+        "render": measure(preparer.render_assessment_mapping, repeat),
+        "end_to_end": measure(lambda: TemplatePreparer(
+            unit_code, extract(), {"course_code": "BENCH"}).render_assessment_mapping(), repeat),
+    }
+    client.close()
+    for stage in RSS_STAGES if rss else ():
+        results[stage]["rss_kb"] = measure_rss(stage, unit_code, content)
+    return results
+
+
+def run_templates_stages(repeat: int) -> dict:
+    """Time scraping and downloading from the fake intranet templates page"""
+    scraper = TemplatesScraper()
+    hrefs = scraper.find_matching_templates()
+    return {
+        "find_templates": measure(scraper.find_matching_templates, repeat),
+        "download_templates": measure(lambda: [scraper.download_template(h) for h in hrefs], repeat),
+    }
+
+
+def run_suite(repeat: int) -> dict:
+    """Run every benchmark against the local stand-in server"""
+    results = {}
+    unit_sizes = {unit_code: sizes for unit_code, sizes in SCALES.values()}
+    with StandInServer(unit_sizes) as server, tempfile.TemporaryDirectory() as work_dir:
+        # Point every URL at the stand-in and every output at the scratch directory
+        src.utils.tga_assets_url = server.url + "assets/"
+        src.template_scraper.base_url = server.url + "TAFE/"
+        src.template_scraper.templates_url = server.url + "TAFE/pageTemplates.asp"
+        src.utils.Paths.VU_Templates = os.path.join(work_dir, "VU")
+
+        scales = {scale: unit_code for scale, (unit_code, _) in SCALES.items()}
+        scales.update((unit_code, unit_code) for unit_code in recorded_units())
+        for scale, unit_code in scales.items():
+            for stage, result in run_unit_stages(unit_code, repeat, work_dir, scale in RSS_SCALES).items():
+                results[f"{stage}/{scale}"] = result
+        for stage, result in run_templates_stages(repeat).items():
+            results[stage] = result
+    return results
+
+
+def relative(result: dict) -> float:
+    """A benchmark's time as a multiple of the reference workload run alongside it"""
+    return result["seconds"] / result["reference"]
+
+
+def combine_runs(runs: list) -> dict:
+    """
+    Merge several suite runs into baseline results
+
+    Each benchmark keeps its median time, absolute and relative to the reference
+    workload, and the run-to-run spread of its relative time, which compare uses
+    as its tolerance.
+    """
+    baseline = {}
+    for name in runs[0]:
+        ratios = [relative(run[name]) for run in runs]
+        baseline[name] = {
+            "seconds": statistics.median(run[name]["seconds"] for run in runs),
+            "relative": statistics.median(ratios),
+            "peak_kb": max(run[name]["peak_kb"] for run in runs),
+            "spread": round(max(ratios) / min(ratios) - 1, 3),
+        }
+        if runs[0][name].get("rss_kb") is not None:
+            baseline[name]["rss_kb"] = max(run[name]["rss_kb"] for run in runs)
+    return baseline
+
+
+def compare(results: dict, baseline: dict, threshold: float, quiet: bool = False) -> list:
+    """
+    Print results against the baseline and return the names of regressed benchmarks
+
+    Times are compared as multiples of the reference workload run alongside each
+    benchmark, so the change shown is relative to the machine's speed at the time.
+    A benchmark regresses when it is slower by more than the threshold and by more
+    than the run-to-run spread recorded in the baseline (counting at most
+    MAX_SPREAD_TOLERANCE of it), or when its peak RSS grows by more than the
+    threshold and RSS_FLOOR_KB.
+    """
+    def show(line):
+        if not quiet:
+            print(line)
+
+    def rss(value):
+        return "-" if value is None else value
+
+    regressions = []
+    show(f"{'benchmark':<28} {'baseline ms':>12} {'current ms':>11} {'change':>8} {'peak KiB':>9} "
+         f"{'RSS KiB':>8} {'baseline':>9}")
+    for name, result in results.items():
+        current = result["seconds"] * 1000
+        if "relative" not in baseline.get(name, {}):
+            show(f"{name:<28} {'-':>12} {current:>11.2f} {'new':>8} {result['peak_kb']:>9} "
+                 f"{rss(result.get('rss_kb')):>8}")
+            continue
+
+        before = baseline[name]
+        change = relative(result) / before["relative"] - 1
+        # The baseline time at the machine's speed while this benchmark ran
+        expected = before["relative"] * result["reference"] * 1000
+        tolerance = max(threshold, min(before.get("spread", 0.0), MAX_SPREAD_TOLERANCE))
+        # Ignore sub-millisecond noise on very fast stages
+        regressed = change > tolerance and current - expected > 1.0
+        rss_before = before.get("rss_kb")
+        if rss_before is not None and result.get("rss_kb") is not None:
+            regressed = regressed or result["rss_kb"] > rss_before * (1 + threshold) + RSS_FLOOR_KB
+        if regressed:
+            regressions.append(name)
+        flag = "  <-- regression" if regressed else ""
+        show(f"{name:<28} {before['seconds'] * 1000:>12.2f} {current:>11.2f} {change:>+7.0%} "
+             f"{result['peak_kb']:>9} {rss(result.get('rss_kb')):>8} {rss(rss_before):>9}{flag}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run the offline benchmark suite")
+    parser.add_argument("--repeat", type=int, default=5, help="Runs per benchmark (best is kept)")
+    parser.add_argument("--save-baseline", action="store_true", help="Store results as the new baseline")
+    parser.add_argument(
+        "--runs", type=int, default=5,
+        help="Suite runs combined into a new baseline, to measure run-to-run spread (default: 5)",
+    )
+    parser.add_argument("--baseline", default=BASELINE_PATH, help="Baseline results file")
+    parser.add_argument("--output", help="Also write results as JSON to this file")
+    parser.add_argument(
+        "--threshold", type=float, default=0.25, help="Slowdown treated as a regression (default: 0.25)"
+    )
+    parser.add_argument("--check", action="store_true", help="Exit with status 1 on regressions")
+    args = parser.parse_args()
+
+    if args.save_baseline:
+        runs = [run_suite(args.repeat) for _ in range(max(2, args.runs))]
+        results = runs[-1]
+    else:
+        results = run_suite(args.repeat)
+
+    if args.save_baseline:
+        with open(args.baseline, "w") as f:
+            json.dump(combine_runs(runs), f, indent=2, sort_keys=True)
+            f.write("\n")
+        print(f"Baseline saved to {args.baseline}")
+
+    baseline = {}
+    if os.path.exists(args.baseline):
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+
+    if not args.save_baseline and compare(results, baseline, args.threshold, quiet=True):
+        # Bursts of load on the machine slow whole groups of stages at once, so a
+        # slowdown only counts if it is still there in the faster of two runs
+        print("Possible regressions; running the suite again to confirm", file=sys.stderr)
+        again = run_suite(args.repeat)
+        results = {name: min(result, again[name], key=relative) for name, result in results.items()}
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+
+    regressions = compare(results, baseline, args.threshold)
+
+    if regressions:
+        print(f"{len(regressions)} regression(s): {', '.join(regressions)}", file=sys.stderr)
+        if args.check:
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
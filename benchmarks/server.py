@@ -0,0 +1,124 @@
+"""
+Local HTTP stand-in for training.gov.au and the VU intranet templates page
+
+Unit XML is served from recorded exports in benchmarks/data/ (named like
+``BSBCRT413_Complete_R1.xml``) when present, and generated with
+benchmarks.fixtures otherwise. Only release 1 of a generated unit exists.
+"""
+import hashlib
+import html
+import os
+import re
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from src.utils import FileNames, Paths, template_titles
+
+from .fixtures import make_unit_xml
+
+DATA_DIR = os.path.join(os.path.dirname(__file__), "data")
+
+_unit_path = re.compile(r"^/assets/[A-Z]{3}/([A-Z]{6}\d{3})_Complete_R(\d+)\.xml$")
+_template_path = re.compile(r"^/TAFE/templates/(.+)$")
+
+
+def unit_xml(unit_code: str, release: int, unit_sizes: dict):
+    """Get the XML served for a unit release, or None if it does not exist"""
+    recorded = os.path.join(DATA_DIR, f"{unit_code}_Complete_R{release}.xml")
+    if os.path.exists(recorded):
+        with open(recorded, "rb") as f:
+            return f.read()
+    if release != 1 or unit_code.startswith("MIS"):
+        return None
+    return make_unit_xml(unit_code, **unit_sizes.get(unit_code, {}))
+
+
+def templates_page() -> bytes:
+    """Intranet templates listing with one row per known template plus unrelated rows"""
+    rows = [(title, f"templates/{title.replace(' ', '%20')}.docx") for title in template_titles]
+    rows += [(f"Unrelated document {i}", f"templates/Unrelated%20{i}.docx") for i in range(20)]
+    body = "".join(
+        f'<tr><td>{html.escape(title)}</td><td><a href="{href}">Download</a></td></tr>'
+        for title, href in rows
+    )
+    return f"<html><body><table>{body}</table></body></html>".encode()
+
+
+class StandInHandler(BaseHTTPRequestHandler):
+    """Serves unit XML, the templates page and template files, with ETag support"""
+
+    protocol_version = "HTTP/1.1"
+
+    # Headers and body are written separately; with Nagle's algorithm the body waits for
+    # the client's delayed ACK, adding a 40 ms stall to some responses but not others
+    disable_nagle_algorithm = True
+
+    # make_unit_xml arguments per unit code, set by StandInServer
+    unit_sizes = {}
+
+    def _content(self):
+        match = _unit_path.match(self.path)
+        if match:
+            return unit_xml(match.group(1), int(match.group(2)), self.unit_sizes), "application/xml"
+        if self.path == "/TAFE/pageTemplates.asp":
+            return templates_page(), "text/html"
+        if _template_path.match(self.path):
+            with open(os.path.join(Paths.Jinja_Templates, FileNames.Assessment_Mapping), "rb") as f:
+                return f.read(), "application/octet-stream"
+        return None, None
+
+    def _respond(self, send_body: bool):
+        content, content_type = self._content()
+        if content is None:
+            self.send_response(404)
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+
+        etag = '"%s"' % hashlib.sha256(content).hexdigest()[:32]
+        if self.headers.get("If-None-Match") == etag:
+            self.send_response(304)
+            self.send_header("ETag", etag)
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+
+        self.send_response(200)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(content)))
+        self.send_header("ETag", etag)
+        self.end_headers()
+        if send_body:
+            self.wfile.write(content)
+
+    def do_GET(self):
+        self._respond(send_body=True)
+
+    def do_HEAD(self):
+        self._respond(send_body=False)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class StandInServer:
+    """Runs the stand-in on a free localhost port in a background thread"""
+
+    def __init__(self, unit_sizes: dict = None):
+        """
+        Args:
+            unit_sizes: make_unit_xml arguments per unit code, for units generated at scale
+        """
+        handler = type("Handler", (StandInHandler,), {"unit_sizes": unit_sizes or {}})
+        self.httpd = ThreadingHTTPServer(("127.0.0.1", 0), handler)
+        self.httpd.daemon_threads = True
+        self.url = f"http://127.0.0.1:{self.httpd.server_address[1]}/"
+        self._thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.httpd.shutdown()
+        self.httpd.server_close()
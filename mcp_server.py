@@ -1,21 +1,188 @@
 """
 This module defines the MCP server for the UoC project.
 """
+import asyncio
+import base64
+import os
+from concurrent.futures import ProcessPoolExecutor
+from typing import List, Optional
+
 from fastmcp import FastMCP
 
-from src.uoc_scraper import UoCData
+from src.memo import LRUTTLCache, SingleFlight
+from src.models import FIELDS, Unit
+from src.uoc_creator import UoCCreator
+from src.utils import FileNames, unit_path_from_code, validate_unit_code as is_valid_unit_code
+
+# Extracted unit data is kept for an hour; units rarely change within a conversation
+UNIT_CACHE_SIZE = 256
+UNIT_CACHE_TTL = 60 * 60
+
+# Bounds on concurrent work so the server stays responsive
+FETCH_CONCURRENCY = 8
+RENDER_WORKERS = max(1, min(4, (os.cpu_count() or 2) - 1))
 
 mcp = FastMCP()
 
+unit_cache = LRUTTLCache(maxsize=UNIT_CACHE_SIZE, ttl=UNIT_CACHE_TTL)
+in_flight = SingleFlight()
+
+_fetcher = None
+_render_pool = None
+_render_slots = None
+
+
+def fetcher():
+    """Async unit fetcher, created on first use so requests and lxml load only when needed"""
+    global _fetcher
+    if _fetcher is None:
+        from src.async_uoc_scraper import AsyncUoCData
+        _fetcher = AsyncUoCData(concurrency=FETCH_CONCURRENCY)
+    return _fetcher
+
+
+def render_pool() -> ProcessPoolExecutor:
+    """Worker processes for rendering documents, started on first use"""
+    global _render_pool
+    if _render_pool is None:
+        _render_pool = ProcessPoolExecutor(max_workers=RENDER_WORKERS)
+    return _render_pool
+
+
+def render_slots() -> asyncio.Semaphore:
+    """Limit on renders queued at once, so one large request cannot monopolise the pool"""
+    global _render_slots
+    if _render_slots is None:
+        _render_slots = asyncio.Semaphore(RENDER_WORKERS * 2)
+    return _render_slots
+
+
+async def load_unit_data(unit_code: str) -> Unit:
+    """Get extracted unit data from the cache, sharing one fetch between concurrent callers"""
+    unit = unit_cache.get(unit_code)
+    if unit is not None:
+        return unit
+
+    async def fetch():
+        # Cached as the slotted model, which takes about a third less memory than the dicts
+        unit = Unit.from_dict(await fetcher().extract(unit_code))
+        unit_cache.set(unit_code, unit)
+        return unit
+
+    return await in_flight.do(unit_code, fetch)
+
+
+def check_fields(fields: Optional[List[str]]):
+    """Raise ValueError if any requested field is not part of the unit data"""
+    unknown = [field for field in fields or [] if field not in FIELDS]
+    if unknown:
+        raise ValueError(f"Unknown fields: {', '.join(unknown)}. Valid fields: {', '.join(FIELDS)}")
+
+
+def select_fields(unit: Unit, fields: Optional[List[str]]) -> dict:
+    """Convert unit data to a dict of only the requested fields"""
+    data = unit.to_dict()
+    if not fields:
+        return data
+    return {field: data[field] for field in fields}
+
+
+async def load_unit_fields(unit_code: str, fields: Optional[List[str]]) -> dict:
+    """Get some fields of a unit, extracting only those unless the whole unit is already cached"""
+    if not fields:
+        return (await load_unit_data(unit_code)).to_dict()
+    unit = unit_cache.get(unit_code)
+    if unit is not None:
+        return select_fields(unit, fields)
+    # Partial data is not cached; the XML it is extracted from is
+    fields = list(dict.fromkeys(fields))
+    return await in_flight.do((unit_code, tuple(fields)), lambda: fetcher().extract(unit_code, fields))
+
+
 @mcp.tool()
-def get_unit_data(unit_code: str) -> dict:
-    """Scrapes and returns all data for a given Unit of Competency."""
-    return UoCData(unit_code).extract_all()
+async def get_unit_data(unit_code: str, fields: Optional[List[str]] = None) -> dict:
+    """Scrapes and returns the data for a given Unit of Competency, optionally only some fields.
+
+    Asking for only the fields needed, such as ["unit_title"], skips extracting the rest.
+    """
+    check_fields(fields)
+    return await load_unit_fields(unit_code, fields)
+
+@mcp.tool()
+async def get_units_data(codes: List[str], fields: Optional[List[str]] = None) -> dict:
+    """Fetches several Units of Competency in parallel, optionally returning only some fields.
+
+    Returns per-unit data under "results" and per-unit error messages under "errors".
+    """
+    check_fields(fields)
+    codes = list(dict.fromkeys(codes))
+    loaded = await asyncio.gather(*(load_unit_fields(code, fields) for code in codes), return_exceptions=True)
+
+    results, errors = {}, {}
+    for code, data in zip(codes, loaded):
+        if isinstance(data, Exception):
+            errors[code] = str(data)
+        else:
+            results[code] = data
+    return {"results": results, "errors": errors}
+
+@mcp.tool()
+async def generate_assessment_mapping(
+    unit_code: str,
+    course_code: Optional[str] = None,
+    course_title: Optional[str] = None,
+    file_version: Optional[str] = None,
+    write_file: bool = False,
+) -> dict:
+    """Generates the VET Assessment Mapping .docx for a Unit of Competency.
+
+    Returns the document as base64 under "docx_base64", or, when write_file is true,
+    saves it in the unit's folder and returns its "path".
+    """
+    uoc_data = await load_unit_data(unit_code)
+    template_details = UoCCreator.DEFAULT_DETAILS.copy()
+    template_details.update({
+        k: v
+        for k, v in {
+            "course_code": course_code,
+            "course_title": course_title,
+            "file_version": file_version,
+        }.items()
+        if v
+    })
+
+    loop = asyncio.get_running_loop()
+    async with render_slots():
+        if write_file:
+            await loop.run_in_executor(
+                render_pool(), UoCCreator.render_unit, unit_code, uoc_data, template_details
+            )
+            path = os.path.join(unit_path_from_code(unit_code), FileNames.Assessment_Mapping)
+            return {"unit_code": unit_code, "path": os.path.abspath(path)}
+
+        content = await loop.run_in_executor(
+            render_pool(), UoCCreator.render_unit_bytes, unit_code, uoc_data, template_details
+        )
+    return {
+        "unit_code": unit_code,
+        "file_name": f"{unit_code}_{FileNames.Assessment_Mapping}",
+        "docx_base64": base64.b64encode(content).decode("ascii"),
+    }
+
+@mcp.tool()
+async def search_units(query: str, limit: int = 20, section: Optional[str] = None) -> List[dict]:
+    """Full-text search over the elements, performance criteria, foundation skills, evidence
+    and assessment conditions of prepared units, best matches first.
+
+    section optionally limits the search to one of: elements, performance_criteria,
+    foundational_skills, performance_evidence, knowledge_evidence, assessment_conditions.
+    """
+    return await asyncio.to_thread(UoCCreator.search_index.search, query, limit, section)
 
 @mcp.tool()
 def validate_unit_code(unit_code: str) -> bool:
     """Validates the format of a Unit of Competency code."""
-    return UoCData.validate_unit_code(unit_code)
+    return is_valid_unit_code(unit_code)
 
 if __name__ == "__main__":
     mcp.run()
@@ -3,10 +3,16 @@ Unit of Competency Creator
 A library for creating VU unit documentation
 """
 
-from .uoc_creator import UoCCreator
-
 __version__ = "1.0.0"
 
 __all__ = [
     "UoCCreator"
 ]
+
+
+def __getattr__(name):
+    # Imported on first use, so importing the package stays cheap
+    if name == "UoCCreator":
+        from .uoc_creator import UoCCreator
+        return UoCCreator
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
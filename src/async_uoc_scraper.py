@@ -0,0 +1,106 @@
+"""
+Module for fetching Unit of Competency data concurrently with asyncio
+"""
+import asyncio
+from concurrent.futures import Executor
+from typing import Dict, Iterable, List, Optional, Union
+
+from .uoc_scraper import UoCData
+from .xml_cache import CacheEntry, XMLCache
+
+
+class AsyncUoCData:
+    """
+    Asynchronous counterpart of UoCData for fetching many units at once
+
+    Downloads run on the shared pooled HTTP client in worker threads, bounded
+    by ``concurrency``, and lxml parsing runs in ``executor`` so the event loop
+    is never blocked. Responses are streamed: into the XML cache and then parsed
+    from it, or, when the cache is disabled, parsed straight off the socket.
+    """
+
+    def __init__(self, concurrency: int = 8, cache: XMLCache = None, executor: Executor = None):
+        """
+        Initialize the async fetcher
+
+        Args:
+            concurrency: Maximum number of units fetched at the same time. The shared
+                HttpClient allows max_per_host (8) requests to training.gov.au at once,
+                so a higher value only queues requests for a connection
+            cache: XML cache to use (defaults to UoCData.cache)
+            executor: Executor for parsing (defaults to the event loop's executor)
+        """
+        self.concurrency = concurrency
+        self.cache = cache
+        self.executor = executor
+        self._semaphores = {}
+
+    def _semaphore(self) -> asyncio.Semaphore:
+        """Get the concurrency limit for the running event loop"""
+        loop = asyncio.get_running_loop()
+        if loop not in self._semaphores:
+            self._semaphores[loop] = asyncio.Semaphore(self.concurrency)
+        return self._semaphores[loop]
+
+    async def latest_release(self, unit_code: str) -> int:
+        """Get the latest release of a unit from the release index"""
+        if not UoCData.validate_unit_code(unit_code):
+            raise ValueError("Invalid unit code format")
+        async with self._semaphore():
+            return await asyncio.to_thread(UoCData.releases.latest, unit_code)
+
+    async def fetch_content(self, unit_code: str, release: int = None) -> bytes:
+        """Fetch the raw XML for a unit, for its latest release by default"""
+        if release is None:
+            release = await self.latest_release(unit_code)
+        elif not UoCData.validate_unit_code(unit_code):
+            raise ValueError("Invalid unit code format")
+        async with self._semaphore():
+            return await asyncio.to_thread(UoCData.fetch_content, unit_code, release, self.cache)
+
+    async def fetch(self, unit_code: str, release: int = None, fields: Optional[List[str]] = None) -> UoCData:
+        """Fetch and parse a unit, for its latest release by default, streaming the XML into the parser"""
+        if release is None:
+            release = await self.latest_release(unit_code)
+        elif not UoCData.validate_unit_code(unit_code):
+            raise ValueError("Invalid unit code format")
+        cache = self.cache or UoCData.cache
+        loop = asyncio.get_running_loop()
+        async with self._semaphore():
+            source = await asyncio.to_thread(UoCData.open_xml, unit_code, release, cache)
+            if not isinstance(source, CacheEntry):
+                # The body is still on the socket, so parsing it is part of the download
+                return await loop.run_in_executor(self.executor, UoCData.from_stream, unit_code, source, release, fields)
+        return await loop.run_in_executor(self.executor, UoCData.from_stream, unit_code, source, release, fields)
+
+    async def extract(self, unit_code: str, fields: Optional[List[str]] = None) -> dict:
+        """Fetch a unit and extract its data, or only the given fields"""
+        uoc = await self.fetch(unit_code, fields=fields)
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self.executor, uoc.extract, fields)
+
+    async def fetch_many(self, unit_codes: Iterable[str]) -> Dict[str, Union[UoCData, Exception]]:
+        """
+        Fetch and parse many units concurrently
+
+        Returns:
+            Mapping of unit code to its UoCData, or to the exception raised for it
+        """
+        unit_codes = list(dict.fromkeys(unit_codes))
+        results = await asyncio.gather(
+            *(self.fetch(unit_code) for unit_code in unit_codes), return_exceptions=True
+        )
+        return dict(zip(unit_codes, results))
+
+    async def extract_many(self, unit_codes: Iterable[str]) -> Dict[str, Union[dict, Exception]]:
+        """
+        Fetch many units concurrently and extract all of their data
+
+        Returns:
+            Mapping of unit code to its data, or to the exception raised for it
+        """
+        unit_codes = list(dict.fromkeys(unit_codes))
+        results = await asyncio.gather(
+            *(self.extract(unit_code) for unit_code in unit_codes), return_exceptions=True
+        )
+        return dict(zip(unit_codes, results))
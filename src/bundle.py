@@ -0,0 +1,72 @@
+"""
+Module for streaming generated unit documents into a single course archive
+"""
+import json
+import os
+import threading
+import time
+import zipfile
+from typing import Union
+
+
+class BundleWriter:
+    """
+    Thread-safe zip archive that outputs are written into as they are produced
+
+    The archive is built beside its destination and moved into place when
+    closed, so a failed run never leaves a truncated bundle behind. Files that
+    are already compressed, such as .docx, are stored rather than deflated
+    again.
+    """
+
+    STORED_EXTENSIONS = ('.docx', '.zip', '.png', '.jpg')
+
+    def __init__(self, path: str, compresslevel: int = 6):
+        """
+        Args:
+            path: Destination of the archive
+            compresslevel: Deflate level for files that are compressed
+        """
+        self.path = path
+        self._temp_path = path + '.tmp'
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        self.compresslevel = compresslevel
+        self._zip = zipfile.ZipFile(self._temp_path, 'w', zipfile.ZIP_DEFLATED)
+        self._lock = threading.Lock()
+        self.names = []
+
+    def add(self, name: str, data: Union[bytes, str]):
+        """Write one file into the archive"""
+        compression = zipfile.ZIP_STORED if name.lower().endswith(self.STORED_EXTENSIONS) else zipfile.ZIP_DEFLATED
+        info = zipfile.ZipInfo(name.replace(os.sep, '/'), date_time=time.localtime()[:6])
+        info.compress_type = compression
+        info.external_attr = 0o644 << 16
+        with self._lock:
+            self._zip.writestr(info, data, compresslevel=self.compresslevel)
+            self.names.append(info.filename)
+
+    def add_json(self, name: str, obj):
+        """Write an object as JSON, formatted like UoCData.save_to_file"""
+        self.add(name, json.dumps(obj, indent=2, default=lambda o: o.to_dict()))
+
+    def close(self):
+        """Finish the archive and move it into place"""
+        with self._lock:
+            self._zip.close()
+            os.replace(self._temp_path, self.path)
+
+    def abort(self):
+        """Discard the partly written archive"""
+        with self._lock:
+            self._zip.close()
+            os.remove(self._temp_path)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.close()
+        else:
+            self.abort()
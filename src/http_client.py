@@ -0,0 +1,131 @@
+"""
+Module providing the pooled, retrying HTTP client shared by the scrapers
+"""
+import random
+import threading
+import time
+import urllib.parse
+
+import requests
+from requests.adapters import HTTPAdapter
+
+
+class HttpClient:
+    """
+    HTTP client with connection pooling, per-host concurrency limits,
+    timeouts and exponential backoff with jitter on 429/5xx responses
+    """
+
+    DEFAULT_TIMEOUT = (10, 60)  # (connect, read) seconds
+    RETRY_STATUSES = frozenset({429, 500, 502, 503, 504})
+
+    def __init__(self, pool_size: int = 16, max_per_host: int = 8, timeout=DEFAULT_TIMEOUT,
+                 max_retries: int = 4, backoff: float = 0.5, max_backoff: float = 30.0):
+        """
+        Initialize the HTTP client
+
+        Args:
+            pool_size: Number of keep-alive connections kept per host
+            max_per_host: Maximum number of concurrent requests per host
+            timeout: Default timeout in seconds, or a (connect, read) tuple
+            max_retries: Number of retries after a failed attempt
+            backoff: Base delay in seconds for exponential backoff
+            max_backoff: Upper bound for a single backoff delay
+        """
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+        self.session.hooks['response'].append(self._count_connection)
+
+        self.timeout = timeout
+        self.max_per_host = max_per_host
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+
+        self._host_limits = {}
+        self._lock = threading.Lock()
+        self.stats = {'requests': 0, 'reused_connections': 0, 'retries': 0}
+
+    def _count(self, key: str):
+        with self._lock:
+            self.stats[key] += 1
+
+    def _host_limit(self, url: str) -> threading.BoundedSemaphore:
+        """Get the concurrency limit for the host of a URL"""
+        host = urllib.parse.urlsplit(url).netloc
+        with self._lock:
+            if host not in self._host_limits:
+                self._host_limits[host] = threading.BoundedSemaphore(self.max_per_host)
+            return self._host_limits[host]
+
+    def _count_connection(self, response, *args, **kwargs):
+        """Response hook recording whether a pooled connection was reused"""
+        connection = getattr(response.raw, 'connection', None)
+        if connection is not None:
+            if getattr(connection, '_used_by_client', False):
+                self._count('reused_connections')
+            else:
+                connection._used_by_client = True
+        return response
+
+    def _backoff_delay(self, attempt: int, response=None) -> float:
+        """Delay before the next attempt, honouring Retry-After when given"""
+        if response is not None:
+            retry_after = response.headers.get('Retry-After', '')
+            if retry_after.isdigit():
+                return min(self.max_backoff, float(retry_after))
+        # Full jitter keeps concurrent workers from retrying in lockstep
+        return random.uniform(0, min(self.max_backoff, self.backoff * 2 ** attempt))
+
+    def request(self, method: str, url: str, **kwargs) -> requests.Response:
+        """Send a request, retrying connection errors, timeouts and 429/5xx responses"""
+        kwargs.setdefault('timeout', self.timeout)
+        attempt = 0
+        while True:
+            self._count('requests')
+            with self._host_limit(url):
+                try:
+                    response = self.session.request(method, url, **kwargs)
+                except (requests.exceptions.ConnectionError, requests.exceptions.Timeout):
+                    if attempt >= self.max_retries:
+                        raise
+                    response = None
+
+            if response is not None and (
+                response.status_code not in self.RETRY_STATUSES or attempt >= self.max_retries
+            ):
+                return response
+
+            delay = self._backoff_delay(attempt, response)
+            if response is not None:
+                response.close()
+            self._count('retries')
+            attempt += 1
+            time.sleep(delay)
+
+    def get(self, url: str, **kwargs) -> requests.Response:
+        """Send a GET request"""
+        return self.request('GET', url, **kwargs)
+
+    def head(self, url: str, **kwargs) -> requests.Response:
+        """Send a HEAD request"""
+        return self.request('HEAD', url, **kwargs)
+
+    def close(self):
+        """Close all pooled connections"""
+        self.session.close()
+
+
+_client = None
+_client_lock = threading.Lock()
+
+
+def get_client() -> HttpClient:
+    """Get the HTTP client shared across the process"""
+    global _client
+    with _client_lock:
+        if _client is None:
+            _client = HttpClient()
+        return _client
@@ -0,0 +1,110 @@
+"""
+Lightweight timing spans around the stages of preparing a unit
+"""
+import json
+import threading
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+from typing import Callable, List, Tuple
+
+# Receives every finished span; None disables instrumentation entirely
+_sink = None
+
+
+def set_sink(sink):
+    """
+    Install the object that receives finished spans and return the previous one
+
+    A sink is any object with a ``record(name, seconds, attrs)`` method.
+    """
+    global _sink
+    previous, _sink = _sink, sink
+    return previous
+
+
+def enabled() -> bool:
+    """Whether a sink is installed"""
+    return _sink is not None
+
+
+@contextmanager
+def span(name: str, **attrs):
+    """Time the enclosed block and report it to the installed sink"""
+    sink = _sink
+    if sink is None:
+        yield
+        return
+
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        sink.record(name, time.perf_counter() - start, attrs)
+
+
+class SpanList:
+    """Sink that keeps every span, e.g. to send them back from a worker process"""
+
+    def __init__(self):
+        self.spans = []
+
+    def record(self, name: str, seconds: float, attrs: dict):
+        self.spans.append((name, seconds, attrs))
+
+
+def capture(func: Callable, *args, **kwargs) -> Tuple[object, List[tuple]]:
+    """Call func with a private SpanList sink and return its result with the spans recorded"""
+    spans = SpanList()
+    previous = set_sink(spans)
+    try:
+        return func(*args, **kwargs), spans.spans
+    finally:
+        set_sink(previous)
+
+
+def replay(spans: List[tuple]):
+    """Report spans captured elsewhere to the installed sink"""
+    sink = _sink
+    if sink is not None:
+        for name, seconds, attrs in spans:
+            sink.record(name, seconds, attrs)
+
+
+class StageRecorder:
+    """Sink that totals span times per unit and stage"""
+
+    def __init__(self):
+        self.units = defaultdict(lambda: defaultdict(float))
+        self.counts = defaultdict(lambda: defaultdict(int))
+        self._lock = threading.Lock()
+
+    def record(self, name: str, seconds: float, attrs: dict):
+        unit_code = attrs.get('unit_code', '-')
+        with self._lock:
+            self.units[unit_code][name] += seconds
+            self.counts[unit_code][name] += 1
+
+    def to_dict(self) -> dict:
+        """Stage timings per unit, in seconds"""
+        return {
+            unit_code: {
+                stage: {'seconds': seconds, 'calls': self.counts[unit_code][stage]}
+                for stage, seconds in stages.items()
+            }
+            for unit_code, stages in self.units.items()
+        }
+
+    def save(self, path: str):
+        """Write the stage timings as JSON"""
+        with open(path, 'w') as f:
+            json.dump(self.to_dict(), f, indent=2)
+
+    def format_report(self) -> str:
+        """Per-unit stage breakdown as a text table"""
+        lines = []
+        for unit_code, stages in sorted(self.units.items()):
+            lines.append(unit_code)
+            for stage, seconds in sorted(stages.items(), key=lambda item: -item[1]):
+                lines.append(f"  {stage:<24} {seconds * 1000:>10.1f} ms")
+        return "\n".join(lines)
@@ -0,0 +1,103 @@
+"""
+Module for tracking the inputs each generated unit output was built from
+"""
+import hashlib
+import json
+import os
+import tempfile
+import threading
+from collections import OrderedDict
+from typing import Dict, Optional
+
+# Hashes of files, keyed on path, mtime and size so an edited file is hashed again;
+# the oldest are dropped beyond MAX_FILE_HASHES
+MAX_FILE_HASHES = 256
+_file_hashes = OrderedDict()
+_file_hashes_lock = threading.Lock()
+
+# Serialises manifest writes in this process, so concurrent records for one unit are all kept
+_record_lock = threading.Lock()
+
+
+def hash_bytes(data: bytes) -> str:
+    """Content hash of raw bytes"""
+    return hashlib.sha256(data).hexdigest()
+
+
+def _to_dict(obj):
+    # Model objects (see models.Unit) hash the same as the dicts they stand in for
+    if hasattr(obj, 'to_dict'):
+        return obj.to_dict()
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+
+def hash_json(obj) -> str:
+    """Content hash of a JSON-serialisable object, independent of key order"""
+    return hash_bytes(json.dumps(obj, sort_keys=True, separators=(',', ':'), default=_to_dict).encode())
+
+
+def hash_file(path: str) -> str:
+    """Content hash of a file, remembered until its mtime or size changes"""
+    stat = os.stat(path)
+    key = (os.path.abspath(path), stat.st_mtime_ns, stat.st_size)
+    with _file_hashes_lock:
+        if key in _file_hashes:
+            _file_hashes.move_to_end(key)
+            return _file_hashes[key]
+
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b''):
+            digest.update(chunk)
+
+    with _file_hashes_lock:
+        _file_hashes[key] = digest.hexdigest()
+        while len(_file_hashes) > MAX_FILE_HASHES:
+            _file_hashes.popitem(last=False)
+    return digest.hexdigest()
+
+
+class UnitManifest:
+    """
+    Per-unit record of the input hashes each output was generated from
+
+    Stored as ``manifest.json`` in the unit's directory.
+    """
+
+    FILE_NAME = "manifest.json"
+
+    def __init__(self, unit_path: str):
+        self.unit_path = unit_path
+        self.path = os.path.join(unit_path, self.FILE_NAME)
+        self.outputs = self._load()
+
+    def _load(self) -> Dict:
+        try:
+            with open(self.path) as f:
+                return json.load(f).get('outputs', {})
+        except (OSError, ValueError):
+            return {}
+
+    def is_current(self, output: str, inputs: Dict[str, Optional[str]]) -> bool:
+        """Check whether an output exists and was generated from exactly these inputs"""
+        if None in inputs.values():
+            return False  # An input that could not be hashed is never known to be unchanged
+        return (
+            self.outputs.get(output) == inputs
+            and os.path.exists(os.path.join(self.unit_path, output))
+        )
+
+    def record(self, output: str, inputs: Dict[str, Optional[str]]):
+        """
+        Record the inputs an output was generated from and save the manifest
+
+        The entry is merged into the manifest as it is on disk now, so outputs
+        recorded by other writers since this one was loaded are kept.
+        """
+        os.makedirs(self.unit_path, exist_ok=True)
+        with _record_lock:
+            self.outputs = {**self._load(), output: inputs}
+            fd, temp_path = tempfile.mkstemp(dir=self.unit_path, suffix='.tmp')
+            with os.fdopen(fd, 'w') as f:
+                json.dump({'outputs': self.outputs}, f, indent=2, sort_keys=True)
+            os.replace(temp_path, self.path)
@@ -0,0 +1,70 @@
+"""
+Module for in-process caching of computed results
+"""
+import asyncio
+import threading
+import time
+from collections import OrderedDict
+from typing import Awaitable, Callable, Hashable
+
+
+class LRUTTLCache:
+    """Thread-safe mapping that drops entries once they are older than ttl or least recently used"""
+
+    def __init__(self, maxsize: int = 256, ttl: float = 3600):
+        """
+        Args:
+            maxsize: Maximum number of entries kept
+            ttl: Seconds an entry stays valid
+        """
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.stats = {'hits': 0, 'misses': 0}
+
+    def get(self, key: Hashable, default=None):
+        """Get a live entry, or default"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] > time.monotonic():
+                self._entries.move_to_end(key)
+                self.stats['hits'] += 1
+                return entry[1]
+            if entry is not None:
+                del self._entries[key]
+            self.stats['misses'] += 1
+            return default
+
+    def set(self, key: Hashable, value):
+        """Store an entry, evicting the least recently used ones beyond maxsize"""
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        """Drop every entry"""
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self):
+        return len(self._entries)
+
+
+class SingleFlight:
+    """Coalesces concurrent async calls for the same key into one in-flight call"""
+
+    def __init__(self):
+        self._in_flight = {}
+
+    async def do(self, key: Hashable, func: Callable[[], Awaitable]):
+        """Await func(), or the call already in flight for key"""
+        task = self._in_flight.get(key)
+        if task is None:
+            task = asyncio.ensure_future(func())
+            self._in_flight[key] = task
+            task.add_done_callback(lambda _: self._in_flight.pop(key, None))
+        # Shielded so one caller giving up does not cancel the call for the others
+        return await asyncio.shield(task)
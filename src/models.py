@@ -0,0 +1,171 @@
+"""
+Typed model of extracted Unit of Competency data
+"""
+import json
+from dataclasses import dataclass, field, fields
+from typing import Dict, List
+
+# Marks the compact serialized form, so the format can change without breaking old files
+COMPACT_VERSION = "uoc1"
+
+
+class _Record:
+    """
+    Mapping-style access to a slotted dataclass
+
+    Lets model objects stand in for the dicts extract_all returns, including
+    ``record['key']`` lookups, ``'key' in record`` and ``{**record}`` in
+    template contexts. Only the dataclass fields are keys.
+    """
+
+    __slots__ = ()
+
+    def __getitem__(self, key: str):
+        if key not in self:
+            raise KeyError(key)
+        return getattr(self, key)
+
+    def __contains__(self, key) -> bool:
+        return key in self.keys()
+
+    def __iter__(self):
+        return iter(self.keys())
+
+    def __len__(self):
+        return len(fields(self))
+
+    def keys(self):
+        return [f.name for f in fields(self)]
+
+    def get(self, key: str, default=None):
+        return getattr(self, key) if key in self else default
+
+
+@dataclass(slots=True)
+class PerformanceCriterion(_Record):
+    index: str
+    description: str
+
+    def to_dict(self) -> Dict:
+        return {'index': self.index, 'description': self.description}
+
+
+@dataclass(slots=True)
+class Element(_Record):
+    index: str
+    title: str
+    performance_criteria: List[PerformanceCriterion] = field(default_factory=list)
+
+    def to_dict(self) -> Dict:
+        return {
+            'index': self.index,
+            'title': self.title,
+            'performance_criteria': [pc.to_dict() for pc in self.performance_criteria],
+        }
+
+
+@dataclass(slots=True)
+class FoundationSkill(_Record):
+    skill: str
+    performance_criteria: List[str] = field(default_factory=list)
+    descriptions: List[str] = field(default_factory=list)
+
+    def to_dict(self) -> Dict:
+        return {
+            'skill': self.skill,
+            'performance_criteria': self.performance_criteria,
+            'descriptions': self.descriptions,
+        }
+
+
+@dataclass(slots=True)
+class Unit(_Record):
+    """All extracted data of a unit, field for field the same as the dict from extract_all"""
+
+    unit_code: str
+    unit_title: str
+    elements: List[Element] = field(default_factory=list)
+    foundational_skills: List[FoundationSkill] = field(default_factory=list)
+    performance_evidence: List[str] = field(default_factory=list)
+    knowledge_evidence: List[str] = field(default_factory=list)
+    assessment_conditions: List[str] = field(default_factory=list)
+
+    @classmethod
+    def from_dict(cls, data: Dict) -> "Unit":
+        """Build a unit from the dict returned by extract_all"""
+        return cls(
+            data['unit_code'],
+            data['unit_title'],
+            [
+                Element(e['index'], e['title'],
+                        [PerformanceCriterion(pc['index'], pc['description']) for pc in e['performance_criteria']])
+                for e in data['elements']
+            ],
+            [
+                FoundationSkill(s['skill'], s['performance_criteria'], s['descriptions'])
+                for s in data['foundational_skills']
+            ],
+            data['performance_evidence'],
+            data['knowledge_evidence'],
+            data['assessment_conditions'],
+        )
+
+    def to_dict(self) -> Dict:
+        """Convert to the dict form returned by extract_all"""
+        return {
+            'unit_code': self.unit_code,
+            'unit_title': self.unit_title,
+            'elements': [e.to_dict() for e in self.elements],
+            'foundational_skills': [s.to_dict() for s in self.foundational_skills],
+            'performance_evidence': self.performance_evidence,
+            'knowledge_evidence': self.knowledge_evidence,
+            'assessment_conditions': self.assessment_conditions,
+        }
+
+    def to_compact(self) -> list:
+        """Positional form of the unit, without repeated key names"""
+        return [
+            COMPACT_VERSION,
+            self.unit_code,
+            self.unit_title,
+            [[e.index, e.title, [[pc.index, pc.description] for pc in e.performance_criteria]]
+             for e in self.elements],
+            [[s.skill, s.performance_criteria, s.descriptions] for s in self.foundational_skills],
+            self.performance_evidence,
+            self.knowledge_evidence,
+            self.assessment_conditions,
+        ]
+
+    @classmethod
+    def from_compact(cls, compact: list) -> "Unit":
+        """Build a unit from its positional form"""
+        version, unit_code, unit_title, elements, skills, performance, knowledge, conditions = compact
+        if version != COMPACT_VERSION:
+            raise ValueError(f"Unsupported unit data format: {version}")
+        return cls(
+            unit_code,
+            unit_title,
+            [Element(index, title, [PerformanceCriterion(*pc) for pc in criteria])
+             for index, title, criteria in elements],
+            [FoundationSkill(*skill) for skill in skills],
+            performance,
+            knowledge,
+            conditions,
+        )
+
+    def dumps(self) -> str:
+        """Serialize to compact JSON"""
+        return json.dumps(self.to_compact(), separators=(',', ':'), ensure_ascii=False)
+
+    @classmethod
+    def loads(cls, text) -> "Unit":
+        """Deserialize compact JSON, or the dict JSON written by UoCData.save_to_file"""
+        data = json.loads(text)
+        if isinstance(data, dict):
+            return cls.from_dict(data)
+        return cls.from_compact(data)
+
+
+# Keys of the data returned by UoCData.extract_all
+FIELDS = tuple(f.name for f in fields(Unit))
+
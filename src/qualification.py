@@ -0,0 +1,84 @@
+"""
+Module for reading a qualification's packaging rules from training.gov.au
+"""
+import re
+from typing import List
+
+from lxml import etree
+
+from .instrumentation import span
+from .uoc_scraper import UoCData
+from .utils import namespaces
+from .xml_cache import XMLCache
+from .xml_stream import book_title
+
+_xp_topics = etree.XPath('//a:Topic', namespaces=namespaces)
+_xp_description = etree.XPath('string(./a:Object/a:Description)', namespaces=namespaces)
+_xp_paragraphs = etree.XPath('./a:Text//a:p', namespaces=namespaces)
+_xp_books = etree.XPath('//a:Book', namespaces=namespaces)
+
+_unit_code = re.compile(r'\b[A-Z]{6}\d{3}\b')
+_group_heading = re.compile(r'\b(core|elective)\b', re.IGNORECASE)
+
+
+class Qualification:
+    """A qualification and the core and elective units listed in its packaging rules"""
+
+    PACKAGING_RULES = 'Packaging Rules'
+
+    def __init__(self, code: str, title: str, core: List[str], electives: List[str], release: int = 1):
+        self.code = code
+        self.title = title
+        self.core = core
+        self.electives = electives
+        self.release = release
+
+    @property
+    def unit_codes(self) -> List[str]:
+        """Core then elective unit codes, without duplicates"""
+        return list(dict.fromkeys(self.core + self.electives))
+
+    @classmethod
+    def fetch(cls, code: str, cache: XMLCache = None, release: int = None) -> "Qualification":
+        """Fetch a qualification's XML from the cache or training.gov.au and read its packaging rules"""
+        if release is None:
+            release = UoCData.releases.latest(code)
+        content = UoCData.fetch_content(code, release, cache)
+        with span('parse', unit_code=code):
+            return cls.from_xml(code, content, release)
+
+    @classmethod
+    def from_xml(cls, code: str, content: bytes, release: int = 1) -> "Qualification":
+        """
+        Read a qualification from its Authorit XML export
+
+        Unit codes in the Packaging Rules topic are assigned to the core or
+        elective group named by the most recent heading mentioning either.
+        """
+        root = etree.fromstring(content)
+
+        title = next(filter(None, map(book_title, _xp_books(root))), None)
+        if title is None:
+            raise ValueError(f"Title not found for qualification {code}")
+
+        rules = [topic for topic in _xp_topics(root)
+                 if cls.PACKAGING_RULES.lower() in _xp_description(topic).lower()]
+        if not rules:
+            raise ValueError(f"Packaging rules not found for qualification {code}")
+
+        groups = {'core': [], 'elective': []}
+        group = 'core'
+        for paragraph in _xp_paragraphs(rules[0]):
+            text = ''.join(paragraph.itertext())
+            codes = _unit_code.findall(text)
+            if not codes:
+                headings = _group_heading.findall(text)
+                if headings:
+                    group = headings[-1].lower()
+                continue
+            groups[group].extend(c for c in codes if c != code)
+
+        if not groups['core'] and not groups['elective']:
+            raise ValueError(f"No units listed in the packaging rules of qualification {code}")
+        return cls(code, title, list(dict.fromkeys(groups['core'])),
+                   list(dict.fromkeys(groups['elective'])), release)
@@ -0,0 +1,150 @@
+"""
+Module for finding the latest release of a unit on training.gov.au
+"""
+import json
+import os
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Iterable, Optional
+
+from .http_client import get_client
+from .utils import Paths, get_unit_xml_url
+
+
+class ReleaseIndex:
+    """
+    On-disk index of the latest known release of each unit
+
+    The latest release is discovered by probing candidate release URLs with
+    concurrent HEAD requests. Answers are served from the index while younger
+    than ``ttl`` seconds; after that, probing resumes from the known release,
+    since releases are only ever added.
+    """
+
+    DEFAULT_TTL = 24 * 60 * 60
+
+    # Releases probed at once; a further window is probed while the last one is found
+    WINDOW = 8
+
+    # Upper bound on probing, in case a server answers every URL
+    MAX_RELEASE = 64
+
+    def __init__(self, path: Optional[str] = None, ttl: float = DEFAULT_TTL,
+                 offline: bool = False, enabled: bool = True):
+        """
+        Initialize the release index
+
+        Args:
+            path: JSON file holding the index (defaults to Cache/releases.json)
+            ttl: Seconds a known release is used without probing again
+            offline: Never touch the network, use known releases regardless of age
+            enabled: Whether the index is read from and written to disk at all
+        """
+        self.path = path or os.path.join(Paths.Cache, "releases.json")
+        self.ttl = ttl
+        self.offline = offline
+        self.enabled = enabled
+        self._lock = threading.Lock()
+        self._units = None
+
+    def _load(self) -> Dict[str, dict]:
+        if self._units is None:
+            self._units = {}
+            if self.enabled:
+                try:
+                    with open(self.path) as f:
+                        self._units = json.load(f).get('units', {})
+                except (OSError, ValueError):
+                    pass
+        return self._units
+
+    def _save(self):
+        if not self.enabled:
+            return
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        fd, temp_path = tempfile.mkstemp(dir=os.path.dirname(self.path), suffix='.tmp')
+        with os.fdopen(fd, 'w') as f:
+            json.dump({'units': self._units}, f, indent=2, sort_keys=True)
+        os.replace(temp_path, self.path)
+
+    def known(self, unit_code: str) -> Optional[int]:
+        """Latest release recorded for a unit, regardless of age"""
+        with self._lock:
+            entry = self._load().get(unit_code)
+        return entry['release'] if entry else None
+
+    def latest(self, unit_code: str) -> int:
+        """Get the latest release of a unit, probing training.gov.au if the index is stale"""
+        with self._lock:
+            entry = self._load().get(unit_code)
+        if entry is not None and (self.offline or time.time() - entry['checked_at'] < self.ttl):
+            return entry['release']
+        if self.offline:
+            # Without an index entry, release 1 is the only guess that needs no network
+            return 1
+
+        start = entry['release'] if entry else 1
+        release = self.probe(unit_code, start)
+        if release is None and start > 1:
+            release = self.probe(unit_code, 1)
+        if release is None:
+            raise ValueError(f"Unit code {unit_code} not found")
+        self.record(unit_code, release)
+        return release
+
+    def record(self, unit_code: str, release: int):
+        """Store the latest release of a unit"""
+        with self._lock:
+            self._load()[unit_code] = {'release': release, 'checked_at': time.time()}
+            self._save()
+
+    @staticmethod
+    def _exists(unit_code: str, release: int) -> bool:
+        url = get_unit_xml_url(unit_code, release)
+        response = get_client().head(url)
+        response.close()
+        if response.status_code == 405:
+            # HEAD not allowed; a streamed GET closed before its body is read is nearly as cheap
+            response = get_client().get(url, stream=True)
+            response.close()
+        if response.status_code not in (200, 404):
+            raise Exception(f"Failed to probe release {release} of {unit_code}. "
+                            f"Status code: {response.status_code}")
+        return response.status_code == 200
+
+    def _probe_window(self, unit_code: str, releases: Iterable[int]) -> Dict[int, bool]:
+        releases = list(releases)
+        with ThreadPoolExecutor(max_workers=len(releases)) as pool:
+            found = pool.map(lambda release: self._exists(unit_code, release), releases)
+            return dict(zip(releases, found))
+
+    def probe(self, unit_code: str, start: int = 1) -> Optional[int]:
+        """
+        Find the highest release of a unit at or after ``start``
+
+        Returns:
+            The latest release, or None if no release from ``start`` onwards exists
+        """
+        latest = None
+        while start <= self.MAX_RELEASE:
+            window = range(start, min(start + self.WINDOW, self.MAX_RELEASE + 1))
+            found = self._probe_window(unit_code, window)
+            existing = [release for release in window if found[release]]
+            if not existing:
+                return latest
+            latest = max(existing)
+            if latest < window[-1]:
+                return latest
+            start = window[-1] + 1
+        return latest
+
+    def purge(self):
+        """Forget every known release"""
+        with self._lock:
+            self._units = {}
+            try:
+                os.remove(self.path)
+            except FileNotFoundError:
+                pass
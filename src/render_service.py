@@ -0,0 +1,418 @@
+"""
+Resident render service that prepares units on warm worker processes
+
+Starting the command line tool imports docx, docxtpl and lxml and loads the
+templates before any work is done. The service pays that once: its worker
+processes import everything and load the templates as they start, then take
+jobs from a queue for as long as the service runs. Jobs are submitted and
+watched over a small JSON API on localhost.
+
+    POST /jobs          {"unit_codes": [...], "details": {...}, "force": false}
+    GET  /jobs/<id>     status of one job
+    POST /jobs/status   {"ids": [...]}, status of several jobs at once
+    GET  /metrics       queue depth, jobs running and throughput
+
+The API has no accounts. On a loopback address it is open to local programs.
+On any other address, every request must carry the service's token as
+``Authorization: Bearer <token>``.
+"""
+import hmac
+import ipaddress
+import itertools
+import json
+import os
+import queue
+import signal
+import threading
+import time
+import urllib.error
+import urllib.request
+from collections import OrderedDict, deque
+from concurrent.futures import ProcessPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Optional
+
+from .utils import FileNames, Paths, validate_unit_code
+
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 8642
+
+# Finished jobs kept for status requests, oldest dropped first
+MAX_FINISHED_JOBS = 10000
+
+# Window over which throughput is reported
+THROUGHPUT_WINDOW = 60.0
+
+
+def _warm_worker(sources: Optional[Dict]):
+    """Process pool initializer: configure data sources, import the renderer and load the templates"""
+    from .template_preparer import TemplatePreparer  # noqa: F401 - imports docx and docxtpl
+    from .template_registry import registry
+    from .uoc_scraper import UoCData
+
+    # Ctrl+C stops the service, which then shuts the workers down itself
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    if sources:
+        UoCData.configure(**sources)
+    template = os.path.join(Paths.Jinja_Templates, FileNames.Assessment_Mapping)
+    if os.path.exists(template):
+        registry.document(template)
+
+
+def _ready() -> int:
+    """No-op job used to start every worker before the service accepts work"""
+    return os.getpid()
+
+
+def _prepare(unit_code: str, details: Dict, force: bool):
+    """Prepare one unit in a worker"""
+    from .uoc_creator import UoCCreator
+
+    UoCCreator().prepare_unit(unit_code, details, force)
+
+
+class RenderService:
+    """Queue of unit jobs run by a pool of warm worker processes"""
+
+    def __init__(self, workers: int = 2, sources: Optional[Dict] = None):
+        """
+        Args:
+            workers: Number of worker processes, and so of jobs run at once
+            sources: Keyword arguments for UoCData.configure in each worker
+        """
+        self.workers = max(1, workers)
+        self.sources = sources
+        self._pool = None
+        self._queue = queue.Queue()
+        self._jobs = OrderedDict()
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+        self._running = 0
+        self._counts = {'completed': 0, 'failed': 0}
+        self._busy_seconds = 0.0
+        self._finished_at = deque()
+        self._started_at = None
+        self._dispatchers = []
+        # Jobs waiting for an earlier job for the same unit, keyed by unit code while that job runs
+        self._waiting = {}
+
+    def start(self):
+        """Start and warm every worker, then begin taking jobs from the queue"""
+        self._pool = ProcessPoolExecutor(max_workers=self.workers, initializer=_warm_worker,
+                                         initargs=(self.sources,))
+        # Submitting one job per worker makes the pool start them all now rather than on demand
+        for future in [self._pool.submit(_ready) for _ in range(self.workers)]:
+            future.result()
+        self._started_at = time.time()
+        for _ in range(self.workers):
+            thread = threading.Thread(target=self._dispatch, daemon=True)
+            thread.start()
+            self._dispatchers.append(thread)
+
+    def stop(self):
+        """Stop taking jobs once the queued ones have finished, and shut the workers down"""
+        for _ in self._dispatchers:
+            self._queue.put(None)
+        for thread in self._dispatchers:
+            thread.join()
+        self._dispatchers = []
+        if self._pool is not None:
+            self._pool.shutdown()
+            self._pool = None
+
+    def submit(self, unit_code: str, details: Optional[Dict] = None, force: bool = False) -> Dict:
+        """
+        Queue a unit to be prepared
+
+        Raises:
+            ValueError: If the unit code is invalid
+        """
+        if not validate_unit_code(unit_code):
+            raise ValueError(f"Invalid unit code format: {unit_code}")
+        with self._lock:
+            job = {
+                'id': str(next(self._ids)),
+                'unit_code': unit_code,
+                'status': 'queued',
+                'submitted_at': time.time(),
+            }
+            self._jobs[job['id']] = job
+        self._queue.put((job, details or {}, force))
+        return dict(job)
+
+    def job(self, job_id: str) -> Optional[Dict]:
+        """Status of a job, or None if it is unknown"""
+        with self._lock:
+            job = self._jobs.get(job_id)
+            return dict(job) if job is not None else None
+
+    def jobs(self, job_ids: List[str]) -> Dict[str, Optional[Dict]]:
+        """Status of several jobs, None for those that are unknown"""
+        with self._lock:
+            return {job_id: dict(self._jobs[job_id]) if job_id in self._jobs else None for job_id in job_ids}
+
+    def _dispatch(self):
+        """
+        Hand queued jobs to the worker pool one at a time
+
+        Jobs for one unit write the same files, so they never run at once: a job
+        for a unit that is already running waits, and is run in order by the
+        dispatcher running that unit once it finishes.
+        """
+        while True:
+            item = self._queue.get()
+            if item is None:
+                return
+            unit_code = item[0]['unit_code']
+            with self._lock:
+                if unit_code in self._waiting:
+                    self._waiting[unit_code].append(item)
+                    continue
+                self._waiting[unit_code] = deque()
+            while item is not None:
+                self._run(*item)
+                with self._lock:
+                    item = self._waiting[unit_code].popleft() if self._waiting[unit_code] else None
+                    if item is None:
+                        del self._waiting[unit_code]
+
+    def _run(self, job: Dict, details: Dict, force: bool):
+        """Run one job on the worker pool and record its outcome"""
+        with self._lock:
+            job['status'] = 'running'
+            self._running += 1
+        start = time.perf_counter()
+        try:
+            self._pool.submit(_prepare, job['unit_code'], details, force).result()
+        except Exception as e:
+            update = {'status': 'failed', 'error': str(e)}
+        else:
+            update = {'status': 'done'}
+        seconds = time.perf_counter() - start
+        with self._lock:
+            job.update(update, seconds=round(seconds, 3))
+            self._running -= 1
+            self._counts['completed' if job['status'] == 'done' else 'failed'] += 1
+            self._busy_seconds += seconds
+            self._finished_at.append(time.time())
+            self._trim_window(time.time())
+            self._forget_old_jobs()
+
+    def _trim_window(self, now: float):
+        while self._finished_at and self._finished_at[0] < now - THROUGHPUT_WINDOW:
+            self._finished_at.popleft()
+
+    def _forget_old_jobs(self):
+        # Jobs are kept in submission order, so the oldest finished ones are at the front
+        while len(self._jobs) > MAX_FINISHED_JOBS:
+            job_id, job = next(iter(self._jobs.items()))
+            if job['status'] not in ('done', 'failed'):
+                break
+            del self._jobs[job_id]
+
+    def metrics(self) -> Dict:
+        """Queue depth, jobs running and throughput"""
+        now = time.time()
+        with self._lock:
+            self._trim_window(now)
+            finished = self._counts['completed'] + self._counts['failed']
+            uptime = now - self._started_at if self._started_at else 0.0
+            return {
+                'workers': self.workers,
+                'queue_depth': self._queue.qsize() + sum(len(waiting) for waiting in self._waiting.values()),
+                'running': self._running,
+                'completed': self._counts['completed'],
+                'failed': self._counts['failed'],
+                'jobs_per_minute': round(len(self._finished_at) * 60.0 / min(THROUGHPUT_WINDOW, max(uptime, 1.0)), 1),
+                'mean_job_seconds': round(self._busy_seconds / finished, 3) if finished else None,
+                'uptime_seconds': round(uptime, 1),
+            }
+
+
+class _Handler(BaseHTTPRequestHandler):
+    """JSON API over a RenderService"""
+
+    service: RenderService = None
+    token: Optional[str] = None
+
+    def _authorized(self) -> bool:
+        if self.token is None:
+            return True
+        expected = f'Bearer {self.token}'.encode('utf-8')
+        return hmac.compare_digest(self.headers.get('Authorization', '').encode('utf-8'), expected)
+
+    def _send(self, status: int, body):
+        data = json.dumps(body).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def do_GET(self):
+        if not self._authorized():
+            return self._send(401, {'error': 'Missing or wrong token'})
+        if self.path == '/metrics':
+            return self._send(200, self.service.metrics())
+        if self.path.startswith('/jobs/'):
+            job = self.service.job(self.path[len('/jobs/'):])
+            if job is None:
+                return self._send(404, {'error': 'Unknown job'})
+            return self._send(200, job)
+        self._send(404, {'error': 'Not found'})
+
+    def do_POST(self):
+        if not self._authorized():
+            return self._send(401, {'error': 'Missing or wrong token'})
+        if self.path == '/jobs/status':
+            return self._job_statuses()
+        if self.path != '/jobs':
+            return self._send(404, {'error': 'Not found'})
+        try:
+            request = self._read_json()
+            if not isinstance(request, dict):
+                raise ValueError("Request body must be a JSON object")
+            unit_codes = request['unit_codes']
+            if not isinstance(unit_codes, list):
+                raise ValueError("unit_codes must be a list")
+            if not isinstance(request.get('details') or {}, dict):
+                raise ValueError("details must be an object")
+            # Check every code before queueing any, so a bad request queues nothing
+            for code in unit_codes:
+                if not isinstance(code, str) or not validate_unit_code(code):
+                    raise ValueError(f"Invalid unit code format: {code}")
+        except (KeyError, ValueError) as e:
+            return self._send(400, {'error': str(e)})
+        jobs = [self.service.submit(code, request.get('details'), bool(request.get('force')))
+                for code in unit_codes]
+        self._send(202, {'jobs': jobs})
+
+    def _read_json(self):
+        return json.loads(self.rfile.read(int(self.headers.get('Content-Length', 0))))
+
+    def _job_statuses(self):
+        try:
+            request = self._read_json()
+            if not isinstance(request, dict):
+                raise ValueError("Request body must be a JSON object")
+            job_ids = request['ids']
+            if not isinstance(job_ids, list):
+                raise ValueError("ids must be a list")
+        except (KeyError, ValueError) as e:
+            return self._send(400, {'error': str(e)})
+        jobs = self.service.jobs([str(job_id) for job_id in job_ids])
+        unknown = [job_id for job_id, job in jobs.items() if job is None]
+        if unknown:
+            return self._send(404, {'error': f"Unknown jobs: {', '.join(unknown)}"})
+        self._send(200, {'jobs': list(jobs.values())})
+
+    def log_message(self, format, *args):
+        pass
+
+
+def is_loopback(host: str) -> bool:
+    """Check whether a host name or address only accepts connections from this machine"""
+    if host == 'localhost':
+        return True
+    try:
+        return ipaddress.ip_address(host).is_loopback
+    except ValueError:
+        return False
+
+
+def serve(host: str = DEFAULT_HOST, port: int = DEFAULT_PORT, workers: int = 2,
+          sources: Optional[Dict] = None, ready=None, token: Optional[str] = None):
+    """
+    Run the render service until interrupted
+
+    Args:
+        workers: Number of worker processes
+        sources: Keyword arguments for UoCData.configure in each worker
+        ready: Optional callback ``(address)`` called once the workers are warm and the server is listening
+        token: Token every request must send as a bearer token, required unless host is a loopback address
+
+    Raises:
+        ValueError: If host is not a loopback address and no token is given
+    """
+    if not token and not is_loopback(host):
+        raise ValueError(f"The render service has no other authentication, so listening on {host} needs a token")
+    service = RenderService(workers, sources)
+    service.start()
+    handler = type('Handler', (_Handler,), {'service': service, 'token': token or None})
+    server = ThreadingHTTPServer((host, port), handler)
+    try:
+        if ready is not None:
+            ready(server.server_address)
+        server.serve_forever()
+    finally:
+        server.server_close()
+        service.stop()
+
+
+class RenderClient:
+    """Client for a running render service"""
+
+    def __init__(self, url: str = f"http://{DEFAULT_HOST}:{DEFAULT_PORT}", timeout: float = 30,
+                 token: Optional[str] = None):
+        self.url = url.rstrip('/')
+        self.timeout = timeout
+        self.token = token
+
+    def _request(self, path: str, body: Optional[Dict] = None) -> Dict:
+        data = json.dumps(body).encode('utf-8') if body is not None else None
+        headers = {'Content-Type': 'application/json'}
+        if self.token:
+            headers['Authorization'] = f'Bearer {self.token}'
+        request = urllib.request.Request(self.url + path, data=data, headers=headers)
+        try:
+            with urllib.request.urlopen(request, timeout=self.timeout) as response:
+                return json.loads(response.read())
+        except urllib.error.HTTPError as e:
+            raise ValueError(json.loads(e.read()).get('error', str(e))) from None
+        except urllib.error.URLError as e:
+            raise ConnectionError(f"Render service not reachable at {self.url}: {e.reason}") from None
+
+    def submit(self, unit_codes: List[str], details: Optional[Dict] = None, force: bool = False) -> List[Dict]:
+        """Queue units to be prepared and return their jobs"""
+        return self._request('/jobs', {'unit_codes': list(unit_codes), 'details': details or {}, 'force': force})['jobs']
+
+    def job(self, job_id: str) -> Dict:
+        return self._request(f'/jobs/{job_id}')
+
+    def jobs(self, job_ids: List[str]) -> List[Dict]:
+        """Status of several jobs in one request"""
+        return self._request('/jobs/status', {'ids': list(job_ids)})['jobs']
+
+    def metrics(self) -> Dict:
+        return self._request('/metrics')
+
+    def wait(self, jobs: List[Dict], on_result=None, interval: float = 0.2,
+             max_interval: float = 2.0) -> Dict[str, Dict]:
+        """
+        Poll jobs until all have finished
+
+        Every pending job is checked in one request. The wait between polls starts
+        at interval and doubles up to max_interval while nothing finishes, and goes
+        back to interval once a job does.
+
+        Args:
+            on_result: Optional callback ``(job)`` called as each job finishes
+
+        Returns:
+            Mapping of job id to its final status
+        """
+        pending = [job['id'] for job in jobs]
+        finished = {}
+        delay = interval
+        while pending:
+            before = len(pending)
+            for job in self.jobs(pending):
+                if job['status'] in ('done', 'failed'):
+                    pending.remove(job['id'])
+                    finished[job['id']] = job
+                    if on_result is not None:
+                        on_result(job)
+            if pending:
+                delay = interval if len(pending) < before else min(delay * 2, max_interval)
+                time.sleep(delay)
+        return {job['id']: finished[job['id']] for job in jobs}
@@ -0,0 +1,155 @@
+"""
+Module for full-text search over extracted unit data
+"""
+import glob
+import json
+import os
+import sqlite3
+import threading
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from .manifest import hash_json
+from .utils import FileNames, Paths
+
+# Titles are kept once per unit rather than on every item, where they would match
+# every item of a unit and swamp the ranking of the item text
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS units (
+    unit_code TEXT PRIMARY KEY,
+    unit_title TEXT,
+    data_hash TEXT NOT NULL
+);
+CREATE VIRTUAL TABLE IF NOT EXISTS items USING fts5 (
+    unit_code UNINDEXED,
+    section UNINDEXED,
+    ref UNINDEXED,
+    text,
+    tokenize = 'porter unicode61'
+);
+PRAGMA user_version = 1;
+"""
+
+
+def unit_items(data: Dict) -> Iterator[Tuple[str, str, str]]:
+    """Yield a (section, ref, text) row for each searchable item of extracted unit data"""
+    for element in data.get('elements', []):
+        yield 'elements', element['index'], element['title']
+        for criterion in element['performance_criteria']:
+            yield 'performance_criteria', criterion['index'], criterion['description']
+    for skill in data.get('foundational_skills', []):
+        yield 'foundational_skills', skill['skill'], ' '.join([skill['skill']] + skill['descriptions'])
+    for section in ('performance_evidence', 'knowledge_evidence', 'assessment_conditions'):
+        for number, text in enumerate(data.get(section, []), 1):
+            yield section, str(number), text
+
+
+class SearchIndex:
+    """
+    SQLite FTS5 index of the elements, performance criteria, foundation skills,
+    evidence and assessment conditions of every prepared unit
+
+    Units are re-indexed only when their extracted data changes. The database
+    is opened on first use, with one connection per thread.
+    """
+
+    def __init__(self, path: Optional[str] = None):
+        """
+        Args:
+            path: Database file (defaults to Cache/search.db)
+        """
+        self.path = path or Paths.Search_Index
+        self._local = threading.local()
+
+    def _connection(self) -> sqlite3.Connection:
+        connection = getattr(self._local, 'connection', None)
+        if connection is None:
+            os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+            connection = sqlite3.connect(self.path, timeout=30)
+            connection.execute('PRAGMA journal_mode=WAL')
+            with connection:
+                connection.executescript(_SCHEMA)
+            self._local.connection = connection
+        return connection
+
+    def update(self, data: Dict, data_hash: Optional[str] = None) -> bool:
+        """
+        Index a unit's extracted data, replacing what was indexed for it before
+
+        Args:
+            data: Unit data as returned by UoCData.extract_all
+            data_hash: hash_json of data, if already computed
+
+        Returns:
+            False if the unit was already indexed with the same data
+        """
+        unit_code = data['unit_code']
+        data_hash = data_hash or hash_json(data)
+        connection = self._connection()
+        with connection:
+            row = connection.execute('SELECT data_hash FROM units WHERE unit_code = ?', (unit_code,)).fetchone()
+            if row is not None and row[0] == data_hash:
+                return False
+            connection.execute('DELETE FROM items WHERE unit_code = ?', (unit_code,))
+            connection.executemany(
+                'INSERT INTO items VALUES (?, ?, ?, ?)',
+                [(unit_code, section, ref, text) for section, ref, text in unit_items(data)],
+            )
+            connection.execute('INSERT OR REPLACE INTO units VALUES (?, ?, ?)',
+                               (unit_code, data['unit_title'], data_hash))
+        return True
+
+    def remove(self, unit_code: str):
+        """Drop a unit from the index"""
+        with self._connection() as connection:
+            connection.execute('DELETE FROM items WHERE unit_code = ?', (unit_code,))
+            connection.execute('DELETE FROM units WHERE unit_code = ?', (unit_code,))
+
+    def index_unit_files(self, units_dir: Optional[str] = None) -> int:
+        """Index every saved unit details JSON file, returning the number of units re-indexed"""
+        pattern = os.path.join(units_dir or Paths.Units, '*', FileNames.Details.format(unit_code='*'))
+        updated = 0
+        for path in sorted(glob.glob(pattern)):
+            with open(path) as f:
+                updated += self.update(json.load(f))
+        return updated
+
+    @staticmethod
+    def _quote(query: str) -> str:
+        """Turn free text into an FTS5 query matching every word"""
+        return ' '.join('"%s"' % word.replace('"', '""') for word in query.split())
+
+    def search(self, query: str, limit: int = 20, section: Optional[str] = None) -> List[Dict]:
+        """
+        Find the items best matching a query, most relevant first
+
+        Args:
+            query: FTS5 query, or plain words that must all appear
+            limit: Maximum number of results
+            section: Only search one section, e.g. 'knowledge_evidence'
+
+        Returns:
+            List of dicts with unit_code, unit_title, section, ref, text and score
+        """
+        sql = (
+            "SELECT items.unit_code, units.unit_title, items.section, items.ref, items.text, bm25(items) AS score "
+            "FROM items JOIN units ON units.unit_code = items.unit_code WHERE items MATCH ?"
+        )
+        if section is not None:
+            sql += " AND items.section = ?"
+        sql += " ORDER BY score LIMIT ?"
+
+        def run(match):
+            params = [match] + ([section] if section is not None else []) + [limit]
+            return self._connection().execute(sql, params).fetchall()
+
+        try:
+            rows = run(query)
+        except sqlite3.OperationalError:
+            # Punctuation in plain text is FTS5 syntax, so fall back to matching the words
+            rows = run(self._quote(query))
+
+        columns = ('unit_code', 'unit_title', 'section', 'ref', 'text', 'score')
+        return [dict(zip(columns, row)) for row in rows]
+
+    def __len__(self):
+        return self._connection().execute('SELECT COUNT(*) FROM units').fetchone()[0]
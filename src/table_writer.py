@@ -0,0 +1,106 @@
+"""
+Module for writing table rows directly as OOXML
+"""
+import copy
+from typing import Iterable, List, Sequence, Tuple
+
+from docx.oxml.ns import qn
+
+# Cell value that continues a vertical merge with the cell above
+MERGED = object()
+
+_W14_IDS = (
+    '{http://schemas.microsoft.com/office/word/2010/wordml}paraId',
+    '{http://schemas.microsoft.com/office/word/2010/wordml}textId',
+)
+
+
+def grouped_rows(groups: Iterable[Tuple[str, Sequence[str]]]) -> List[tuple]:
+    """
+    Lay out (label, items) groups as rows with the label merged down the first column
+
+    A group without items still gets one row for its label.
+    """
+    rows = []
+    for label, items in groups:
+        items = list(items) or ['']
+        rows.append((label, items[0]))
+        rows.extend((MERGED, item) for item in items[1:])
+    return rows
+
+
+def _prototype_row(table, header_rows: int):
+    """Get a blank copy of the table's first body row, or a plain grid row if it has none"""
+    trs = table._tbl.tr_lst
+    if len(trs) > header_rows:
+        tr = copy.deepcopy(trs[header_rows])
+    else:
+        tr = table.add_row()._tr
+        tr.getparent().remove(tr)
+
+    for element in tr.iter():
+        for attribute in _W14_IDS:
+            element.attrib.pop(attribute, None)
+    for tc in tr.tc_lst:
+        tc.vMerge = None
+        _set_cell_text(tc, '')
+    return tr
+
+
+def _set_cell_text(tc, text: str):
+    """Replace a cell's content with text, keeping its first paragraph and run formatting"""
+    paragraphs = tc.findall(qn('w:p'))
+    if paragraphs:
+        paragraph = paragraphs[0]
+        for extra in paragraphs[1:]:
+            tc.remove(extra)
+    else:
+        paragraph = tc.add_p()
+
+    run_properties = paragraph.find(f"{qn('w:r')}/{qn('w:rPr')}")
+    for child in list(paragraph):
+        if child.tag != qn('w:pPr'):
+            paragraph.remove(child)
+
+    if text:
+        run = paragraph.add_r()
+        if run_properties is not None:
+            run.insert(0, run_properties)
+        run.text = text
+
+
+def fill_table(table, rows: Iterable[Sequence], header_rows: int = 2):
+    """
+    Replace a table's body rows in a single pass
+
+    Each row is a sequence of cell texts addressed by cell position; missing
+    trailing cells are left blank and a MERGED value continues a vertical merge
+    (vMerge) from the cell above. New rows copy the formatting of the template's
+    first body row.
+
+    Args:
+        table: python-docx Table to fill
+        rows: Cell texts for each body row
+        header_rows: Number of leading rows to keep
+    """
+    tbl = table._tbl
+    prototype = _prototype_row(table, header_rows)
+    for tr in tbl.tr_lst[header_rows:]:
+        tbl.remove(tr)
+
+    # Cell that starts the current merge, per column
+    merge_starts = {}
+    for values in rows:
+        tr = copy.deepcopy(prototype)
+        tcs = tr.tc_lst
+        for column, value in enumerate(values[:len(tcs)]):
+            tc = tcs[column]
+            if value is MERGED:
+                start = merge_starts.get(column)
+                if start is not None:
+                    start.vMerge = 'restart'
+                    tc.vMerge = 'continue'
+            else:
+                merge_starts[column] = tc
+                _set_cell_text(tc, value or '')
+        tbl.append(tr)
@@ -1,30 +1,33 @@
 """
 Module for preparing and populating templates with Unit of Competency data
 """
+import io
 import os
-import shutil
-import tempfile
 
-from docx import Document
 from docxtpl import DocxTemplate
 
+from .instrumentation import span
+from .table_writer import fill_table, grouped_rows
+from .template_registry import registry
 from .utils import FileNames, Paths, unit_path_from_code
 
 
 class TemplatePreparer:
     """Class for preparing and populating templates with UoC data"""
     
-    def __init__(self, unit_code: str, uoc_data: dict, additional_details: dict = None):
+    def __init__(self, unit_code: str, uoc_data: dict, additional_details: dict = None, unit_path: str = None):
         """
         Initialize template preparer
         
         Args:
             unit_code: The unit code
-            uoc_data: Unit of Competency data
+            uoc_data: Unit of Competency data, as a dict from extract_all or a models.Unit
             additional_details: Additional template details (version, course info etc)
+            unit_path: Output directory (defaults to the unit's folder under Units)
         """
         self.unit_code = unit_code
-        self.unit_path = unit_path_from_code(unit_code)
+        self.unit_path = unit_path or unit_path_from_code(unit_code)
+        self.assessment_mapping_template = os.path.join(Paths.Jinja_Templates, FileNames.Assessment_Mapping)
         self.uoc_data = uoc_data
         self.template_context = {**uoc_data}
         
@@ -35,53 +38,27 @@ class TemplatePreparer:
         """Create unit directory if it doesn't exist"""
         os.makedirs(self.unit_path, exist_ok=True)
     
-    def _prepare_assessment_mapping(self):
-        """Prepare the Assessment Mapping document"""
-        jinja_template_path = os.path.join(Paths.Jinja_Templates, FileNames.Assessment_Mapping)
-        output_path = os.path.join(self.unit_path, FileNames.Assessment_Mapping)
-        
-        # Create temp file for intermediate processing
-        with tempfile.NamedTemporaryFile(delete=False) as temp_file:
-            # Copy template to temp file
-            shutil.copy2(jinja_template_path, temp_file.name)
-            
-            # Render template with context
-            template = DocxTemplate(temp_file.name)
+    def _render_assessment_mapping(self) -> DocxTemplate:
+        """Render the Assessment Mapping document in memory"""
+        # Render template with context, then fill the tables on the same document
+        with span('render_template', unit_code=self.unit_code):
+            template = registry.docx_template(self.assessment_mapping_template)
             template.render(self.template_context)
-            template.save(temp_file.name)
-            
-            # Further processing with python-docx
-            doc = Document(temp_file.name)
-            
+        doc = template.docx
+        
+        with span('fill_tables', unit_code=self.unit_code):
             # Process Elements & Performance Criteria table
-            table = doc.tables[1]
-            self._clear_table_rows(table)
-            row = 2
-            for element in self.uoc_data["elements"]:
-                start_row = row
-                for pc in element["performance_criteria"]:
-                    new_row = table.add_row()
-                    new_row.cells[1].text = f"{pc['index']} {pc['description']}"
-                
-                table.rows[start_row].cells[0].text = f"{element['index']}. {element['title']}"
-                if start_row != row:
-                    self._merge_cells(table, start_row, row, 0)
-                row += len(element["performance_criteria"])
+            fill_table(doc.tables[1], grouped_rows(
+                (f"{element['index']}. {element['title']}",
+                 [f"{pc['index']} {pc['description']}" for pc in element["performance_criteria"]])
+                for element in self.uoc_data["elements"]
+            ))
             
             # Process Foundation Skills table
-            table = doc.tables[2]
-            self._clear_table_rows(table)
-            row = 2
-            for skill in self.uoc_data["foundational_skills"]:
-                start_row = row
-                for desc in skill["descriptions"]:
-                    new_row = table.add_row()
-                    new_row.cells[1].text = desc
-                
-                table.rows[start_row].cells[0].text = skill["skill"]
-                if start_row != row:
-                    self._merge_cells(table, start_row, row, 0)
-                row += len(skill["descriptions"])
+            fill_table(doc.tables[2], grouped_rows(
+                (skill["skill"], skill["descriptions"])
+                for skill in self.uoc_data["foundational_skills"]
+            ))
             
             # Process Evidence tables
             self._populate_evidence_table(doc.tables[4], self.uoc_data["performance_evidence"])
@@ -90,36 +67,28 @@ class TemplatePreparer:
             
             # Remove Range of Conditions table
             doc.tables[3]._tbl.getparent().remove(doc.tables[3]._tbl)
-            
-            # Save final document
-            doc.save(output_path)
-            
-            # Cleanup temp file
-            try:
-                os.remove(temp_file.name)
-            except Exception:
-                pass  # Ignore cleanup errors
+        
+        return template
     
-    @staticmethod
-    def _clear_table_rows(table):
-        """Remove all rows from table except headers"""
-        for row in range(len(table.rows) - 1, 1, -1):
-            table._tbl.remove(table.rows[row]._tr)
+    def _prepare_assessment_mapping(self):
+        """Prepare the Assessment Mapping document"""
+        output_path = os.path.join(self.unit_path, FileNames.Assessment_Mapping)
+        template = self._render_assessment_mapping()
+        with span('save_docx', unit_code=self.unit_code):
+            template.save(output_path)
     
-    @staticmethod
-    def _merge_cells(table, start_row, end_row, col):
-        """Merge cells in a column between start and end rows"""
-        start_cell = table.rows[start_row].cells[col]
-        end_cell = table.rows[end_row].cells[col]
-        start_cell.merge(end_cell)
+    def render_assessment_mapping(self) -> bytes:
+        """Render the Assessment Mapping document and return it as .docx bytes"""
+        template = self._render_assessment_mapping()
+        buffer = io.BytesIO()
+        with span('save_docx', unit_code=self.unit_code):
+            template.save(buffer)
+        return buffer.getvalue()
     
     @staticmethod
     def _populate_evidence_table(table, items):
         """Populate a simple evidence table with items"""
-        TemplatePreparer._clear_table_rows(table)
-        for item in items:
-            new_row = table.add_row()
-            new_row.cells[0].text = item
+        fill_table(table, ((item,) for item in items))
     
     def prepare_all_templates(self):
         """Prepare all templates for the unit"""
@@ -0,0 +1,118 @@
+"""
+Module for keeping parsed .docx templates warm across renders
+"""
+import copy
+import io
+import os
+import threading
+
+from docx import Document
+from docxtpl import DocxTemplate
+from jinja2 import Environment
+
+
+class _CachingEnvironment(Environment):
+    """Jinja environment that compiles each distinct template source only once"""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._compiled = {}
+
+    def from_string(self, source, globals=None, template_class=None):
+        if globals or template_class or not isinstance(source, str):
+            return super().from_string(source, globals, template_class)
+        template = self._compiled.get(source)
+        if template is None:
+            template = self._compiled[source] = super().from_string(source)
+        return template
+
+
+class _WarmDocxTemplate(DocxTemplate):
+    """DocxTemplate that reuses the registry's patched XML and compiled Jinja templates"""
+
+    def __init__(self, template_file, registry: "TemplateRegistry"):
+        super().__init__(template_file)
+        self._registry = registry
+
+    def patch_xml(self, src_xml):
+        patched = self._registry._patched_xml.get(src_xml)
+        if patched is None:
+            patched = self._registry._patched_xml[src_xml] = super().patch_xml(src_xml)
+        return patched
+
+    def render(self, context, jinja_env=None, autoescape=False):
+        if jinja_env is None and not autoescape:
+            jinja_env = self._registry._jinja_env
+        super().render(context, jinja_env, autoescape)
+
+
+class TemplateRegistry:
+    """
+    Process-wide cache of parsed .docx templates
+
+    Each template file is read and parsed once. Renders get a deep copy of the
+    parsed package, and a template is reloaded automatically when its file's
+    modification time or size changes. The docxtpl preprocessing and Jinja
+    compilation of a template's XML parts are cached alongside it.
+    """
+
+    def __init__(self):
+        self._entries = {}
+        self._lock = threading.Lock()
+        self._reset_render_caches()
+        self.stats = {'hits': 0, 'misses': 0, 'invalidations': 0}
+
+    def _reset_render_caches(self):
+        # Keyed by XML source, so entries for stale templates are simply never hit again
+        self._patched_xml = {}
+        self._jinja_env = _CachingEnvironment()
+
+    @staticmethod
+    def _key(path: str):
+        stat = os.stat(path)
+        return stat.st_mtime_ns, stat.st_size
+
+    def _load(self, path: str):
+        """Get the parsed template for a path, loading it if missing or stale"""
+        path = os.path.abspath(path)
+        key = self._key(path)
+        with self._lock:
+            entry = self._entries.get(path)
+            if entry is not None and entry[0] == key:
+                self.stats['hits'] += 1
+                return entry[1]
+            if entry is not None:
+                self.stats['invalidations'] += 1
+                self._reset_render_caches()
+            self.stats['misses'] += 1
+
+            with open(path, 'rb') as f:
+                document = Document(io.BytesIO(f.read()))
+            self._entries[path] = (key, document)
+            return document
+
+    def document(self, path: str):
+        """Get a private copy of the parsed template at path"""
+        return copy.deepcopy(self._load(path))
+
+    def docx_template(self, path: str) -> DocxTemplate:
+        """Get a DocxTemplate for path, backed by a private copy of the parsed template"""
+        template = _WarmDocxTemplate(path, self)
+        template.docx = self.document(path)
+        return template
+
+    def invalidate(self, path: str = None):
+        """Drop a cached template, or every cached template when no path is given"""
+        with self._lock:
+            if path is None:
+                dropped = len(self._entries)
+                self._entries.clear()
+            else:
+                dropped = int(self._entries.pop(os.path.abspath(path), None) is not None)
+            self.stats['invalidations'] += dropped
+            if dropped:
+                self._reset_render_caches()
+
+
+# Registry shared by everything rendering in this process
+registry = TemplateRegistry()
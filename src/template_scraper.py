@@ -1,23 +1,34 @@
 """
 Module for scraping VU templates from the intranet
 """
+import hashlib
+import json
 import os
 import shutil
+import tempfile
 import urllib.parse
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
+from typing import Dict
 
 import requests
 from bs4 import BeautifulSoup
 from requests_ntlm import HttpNtlmAuth
 
+from .http_client import HttpClient
 from .utils import Paths, base_url, template_titles, templates_url
 
 
 class TemplatesScraper:
     """Class for scraping VU templates from the intranet"""
     
+    # Per-template validators and checksums from the last sync, kept with the templates
+    MANIFEST_FILE = "manifest.json"
+    
     def __init__(self):
-        self.session = requests.Session()
+        # NTLM auth is bound to the session, so the scraper keeps its own client
+        self.http = HttpClient(max_retries=2)
+        self.session = self.http.session
         self._setup_output_dir()
     
     def _setup_output_dir(self):
@@ -34,7 +45,7 @@ class TemplatesScraper:
         self.session.auth = HttpNtlmAuth(username, password)
         
         try:
-            response = self.session.get(templates_url)
+            response = self.http.get(templates_url)
             return response.status_code == 200
         except requests.exceptions.ConnectionError as e:
             if "Failed to resolve" in str(e) or "[Errno 11001] getaddrinfo failed" in str(e):
@@ -48,7 +59,7 @@ class TemplatesScraper:
     
     def find_matching_templates(self) -> list:
         """Find templates matching predefined titles"""
-        response = self.session.get(templates_url)
+        response = self.http.get(templates_url)
         soup = BeautifulSoup(response.text, "html.parser")
         
         matching_hrefs = []
@@ -67,26 +78,146 @@ class TemplatesScraper:
         file_name = urllib.parse.unquote(os.path.basename(href))
         file_path = os.path.join(Paths.VU_Templates, file_name)
         
-        with self.session.get(base_url + href, stream=True) as r:
+        with self.http.get(base_url + href, stream=True) as r:
             with open(file_path, 'wb') as f:
                 shutil.copyfileobj(r.raw, f)
         
         return file_name
     
     def download_all_templates(self) -> list:
-        """Download all matching templates"""
+        """Download all matching templates, recording them in the manifest for later syncs"""
         hrefs = self.find_matching_templates()
         if not hrefs:
             raise ValueError("No matching templates found")
         
+        manifest = self.load_manifest()
         downloaded = []
         for href in hrefs:
-            file_name = self.download_template(href)
+            # Without a previous entry the request is unconditional
+            file_name, entry, _ = self.sync_template(href)
+            manifest[file_name] = entry
             downloaded.append(file_name)
         
-        # Save timestamp
+        self._save_manifest(manifest)
+        self._save_timestamp()
+        return downloaded
+    
+    @staticmethod
+    def _save_timestamp():
         with open(os.path.join(Paths.VU_Templates, "last_downloaded.txt"), "w") as f:
             timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
             f.write(timestamp)
+    
+    def _manifest_path(self) -> str:
+        return os.path.join(Paths.VU_Templates, self.MANIFEST_FILE)
+    
+    def load_manifest(self) -> Dict[str, dict]:
+        """Load the sync manifest, keyed by template file name"""
+        try:
+            with open(self._manifest_path()) as f:
+                return json.load(f).get('templates', {})
+        except (OSError, ValueError):
+            return {}
+    
+    def _save_manifest(self, templates: Dict[str, dict]):
+        fd, temp_path = tempfile.mkstemp(dir=Paths.VU_Templates, suffix='.tmp')
+        with os.fdopen(fd, 'w') as f:
+            json.dump({'templates': templates}, f, indent=2, sort_keys=True)
+        os.replace(temp_path, self._manifest_path())
+    
+    def sync_template(self, href: str, entry: dict = None) -> tuple:
+        """
+        Download a template only if it changed since it was last synced
         
-        return downloaded
+        Args:
+            href: Link to the template on the templates page
+            entry: The template's manifest entry from the last sync, if any
+        
+        Returns:
+            Tuple of the file name, its new manifest entry and whether the file changed
+        """
+        file_name = urllib.parse.unquote(os.path.basename(href))
+        file_path = os.path.join(Paths.VU_Templates, file_name)
+        if entry and not os.path.exists(file_path):
+            entry = None
+        
+        headers = {}
+        if entry and entry.get('etag'):
+            headers['If-None-Match'] = entry['etag']
+        if entry and entry.get('last_modified'):
+            headers['If-Modified-Since'] = entry['last_modified']
+        
+        with self.http.get(base_url + href, headers=headers, stream=True) as r:
+            if r.status_code == 304:
+                return file_name, entry, False
+            r.raise_for_status()
+            
+            # Write beside the target and rename, so a failed download never leaves a partial file
+            digest = hashlib.sha256()
+            fd, temp_path = tempfile.mkstemp(dir=Paths.VU_Templates, suffix='.tmp')
+            try:
+                with os.fdopen(fd, 'wb') as f:
+                    for chunk in r.iter_content(chunk_size=64 * 1024):
+                        digest.update(chunk)
+                        f.write(chunk)
+                new_entry = {
+                    'href': href,
+                    'sha256': digest.hexdigest(),
+                    'etag': r.headers.get('ETag'),
+                    'last_modified': r.headers.get('Last-Modified'),
+                }
+                changed = not entry or entry.get('sha256') != new_entry['sha256']
+                if changed:
+                    os.replace(temp_path, file_path)
+                else:
+                    os.remove(temp_path)
+            except Exception:
+                if os.path.exists(temp_path):
+                    os.remove(temp_path)
+                raise
+        
+        return file_name, new_entry, changed
+    
+    def sync_templates(self, workers: int = 8) -> Dict[str, list]:
+        """
+        Download changed templates in parallel, skipping any that are unchanged
+        
+        These are the VU originals that the templates in Templates/Jinja are made
+        from; the report tells the caller which ones to review. The rendered
+        templates are reloaded by the registry whenever their own files change.
+        
+        Args:
+            workers: Number of templates downloaded at the same time
+        
+        Returns:
+            Dict of the template file names that were 'updated' and 'unchanged',
+            and under 'failed' a mapping of file name to error message
+        """
+        hrefs = self.find_matching_templates()
+        if not hrefs:
+            raise ValueError("No matching templates found")
+        
+        manifest = self.load_manifest()
+        report = {'updated': [], 'unchanged': [], 'failed': {}}
+        
+        def sync(href):
+            file_name = urllib.parse.unquote(os.path.basename(href))
+            try:
+                return self.sync_template(href, manifest.get(file_name))
+            except Exception as e:
+                return file_name, e, False
+        
+        with ThreadPoolExecutor(max_workers=max(1, min(workers, len(hrefs)))) as pool:
+            for file_name, entry, changed in pool.map(sync, hrefs):
+                if isinstance(entry, Exception):
+                    report['failed'][file_name] = str(entry)
+                    continue
+                manifest[file_name] = entry
+                if changed:
+                    report['updated'].append(file_name)
+                else:
+                    report['unchanged'].append(file_name)
+        
+        self._save_manifest(manifest)
+        self._save_timestamp()
+        return report
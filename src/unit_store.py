@@ -0,0 +1,194 @@
+"""
+Module for a local SQLite store of extracted unit data, built from bulk XML exports
+"""
+import os
+import re
+import sqlite3
+import threading
+import time
+import zipfile
+from collections import namedtuple
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from lxml import etree
+
+from .models import Unit
+from .uoc_scraper import UoCData
+from .utils import Paths
+
+# Unit XML exports are named like BSBCRT413_Complete_R1.xml
+_export_name = re.compile(r'([A-Z]{6}\d{3})_Complete_R(\d+)\.xml$', re.IGNORECASE)
+
+StoredUnit = namedtuple('StoredUnit', 'unit_code release industry xml_hash data')
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS units (
+    unit_code TEXT NOT NULL,
+    release INTEGER NOT NULL,
+    industry TEXT NOT NULL,
+    unit_title TEXT,
+    xml_hash TEXT,
+    data TEXT NOT NULL,
+    ingested_at REAL NOT NULL,
+    PRIMARY KEY (unit_code, release)
+);
+CREATE INDEX IF NOT EXISTS units_by_industry ON units (industry, unit_code);
+"""
+
+
+class UnitStore:
+    """
+    SQLite database of extracted unit data, keyed by unit code and release
+
+    Each thread gets its own connection, so the store can be shared by the
+    fetch workers of a batch.
+    """
+
+    def __init__(self, path: Optional[str] = None):
+        """
+        Open (and create if needed) a unit store
+
+        Args:
+            path: Database file (defaults to Cache/units.db)
+        """
+        self.path = path or Paths.Unit_Store
+        self._local = threading.local()
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        with self._connection() as connection:
+            connection.executescript(_SCHEMA)
+
+    def _connection(self) -> sqlite3.Connection:
+        connection = getattr(self._local, 'connection', None)
+        if connection is None:
+            connection = sqlite3.connect(self.path)
+            connection.execute('PRAGMA journal_mode=WAL')
+            connection.execute('PRAGMA synchronous=NORMAL')
+            self._local.connection = connection
+        return connection
+
+    def get(self, unit_code: str, release: Optional[int] = None) -> Optional[StoredUnit]:
+        """Get a stored unit, at its latest stored release unless one is given"""
+        query = 'SELECT unit_code, release, industry, xml_hash, data FROM units WHERE unit_code = ?'
+        params = [unit_code]
+        if release is not None:
+            query += ' AND release = ?'
+            params.append(release)
+        row = self._connection().execute(query + ' ORDER BY release DESC LIMIT 1', params).fetchone()
+        if row is None:
+            return None
+        return StoredUnit(*row[:4], Unit.loads(row[4]).to_dict())
+
+    def put_many(self, units: List[Tuple[str, int, Optional[str], Dict]]):
+        """
+        Store (unit_code, release, xml_hash, data) records, replacing existing ones, in one transaction
+
+        Data is kept in the compact form of models.Unit, without the repeated key names.
+        """
+        now = time.time()
+        rows = [
+            (code, release, code[:3], data.get('unit_title'), xml_hash, Unit.from_dict(data).dumps(), now)
+            for code, release, xml_hash, data in units
+        ]
+        with self._connection() as connection:
+            connection.executemany('INSERT OR REPLACE INTO units VALUES (?, ?, ?, ?, ?, ?, ?)', rows)
+
+    def unit_codes(self, industry: Optional[str] = None) -> List[str]:
+        """Codes of every stored unit, optionally only those of one industry prefix"""
+        if industry is None:
+            rows = self._connection().execute('SELECT DISTINCT unit_code FROM units ORDER BY unit_code')
+        else:
+            rows = self._connection().execute(
+                'SELECT DISTINCT unit_code FROM units WHERE industry = ? ORDER BY unit_code', (industry,)
+            )
+        return [row[0] for row in rows]
+
+    def __len__(self):
+        return self._connection().execute('SELECT COUNT(*) FROM units').fetchone()[0]
+
+    def close(self):
+        """Close this thread's connection"""
+        connection = getattr(self._local, 'connection', None)
+        if connection is not None:
+            connection.close()
+            self._local.connection = None
+
+
+def _iter_exports(source: str) -> Iterator[Tuple[str, int, object]]:
+    """Yield (unit_code, release, path or bytes) for each unit XML export in a directory or zip"""
+    if zipfile.is_zipfile(source):
+        with zipfile.ZipFile(source) as archive:
+            for name in archive.namelist():
+                match = _export_name.search(name)
+                if match:
+                    yield match.group(1).upper(), int(match.group(2)), archive.read(name)
+        return
+
+    for dir_path, _, file_names in os.walk(source):
+        for file_name in sorted(file_names):
+            match = _export_name.search(file_name)
+            if match:
+                yield match.group(1).upper(), int(match.group(2)), os.path.join(dir_path, file_name)
+
+
+def _extract_export(unit_code: str, release: int, source) -> Tuple[str, int, str, Dict]:
+    """Parse one export with the UoCData extraction logic (runs in a worker process)"""
+    try:
+        if isinstance(source, bytes):
+            uoc = UoCData.from_xml(unit_code, source, release)
+        else:
+            uoc = UoCData.from_stream(unit_code, source, release)
+        return unit_code, release, uoc.xml_hash, uoc.extract_all()
+    except etree.LxmlError as e:
+        # lxml errors carry an error log that cannot be sent back from the worker
+        raise ValueError(f"Invalid unit XML: {e}") from None
+
+
+def ingest(source: str, store: UnitStore, workers: Optional[int] = None,
+           batch_size: int = 200) -> Dict[str, object]:
+    """
+    Parse every unit XML export in a directory or zip into the store
+
+    Args:
+        source: Directory or zip file of exports named like BSBCRT413_Complete_R1.xml
+        store: Store receiving the extracted data
+        workers: Number of parsing processes (defaults to the CPU count)
+        batch_size: Number of units written per transaction
+
+    Returns:
+        Dict with the number of units 'ingested' and a mapping of 'failed' exports to their errors
+    """
+    if not os.path.exists(source):
+        raise ValueError(f"Nothing to ingest at {source}")
+
+    workers = workers or os.cpu_count() or 1
+    ingested, failed, pending_rows = 0, {}, []
+
+    def collect(futures):
+        for future in futures:
+            code, release = pending.pop(future)
+            try:
+                pending_rows.append(future.result())
+            except Exception as e:
+                failed[f"{code} R{release}"] = e
+        if len(pending_rows) >= batch_size:
+            flush()
+
+    def flush():
+        nonlocal ingested
+        store.put_many(pending_rows)
+        ingested += len(pending_rows)
+        pending_rows.clear()
+
+    pending = {}
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        for unit_code, release, export in _iter_exports(source):
+            # Bound the exports held in memory while reading from large archives
+            if len(pending) >= workers * 4:
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                collect(done)
+            pending[pool.submit(_extract_export, unit_code, release, export)] = (unit_code, release)
+        collect(list(pending))
+    flush()
+
+    return {'ingested': ingested, 'failed': failed}
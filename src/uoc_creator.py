@@ -2,12 +2,19 @@
 Main interface for Unit of Competency Creator
 """
 import getpass
+import os
 import re
-from typing import Dict, Optional
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, ThreadPoolExecutor, wait
+from typing import Dict, Iterable, List, Optional
 
-from .template_preparer import TemplatePreparer
-from .template_scraper import TemplatesScraper
-from .uoc_scraper import UoCData
+from . import instrumentation
+from .manifest import UnitManifest, hash_file, hash_json
+from .search_index import SearchIndex
+from .utils import FileNames, Paths, unit_path_from_code, validate_unit_code
+
+# TemplatePreparer (docx, docxtpl), TemplatesScraper (requests_ntlm, bs4) and
+# UoCData (requests, lxml) are imported by the methods that use them, so that
+# commands which never fetch or render start quickly.
 
 
 class UoCCreator:
@@ -19,6 +26,9 @@ class UoCCreator:
         'course_title': "Certificate III in Emerging Technologies"
     }
     
+    # Full-text index kept up to date as units are prepared; None disables indexing
+    search_index = SearchIndex()
+    
     def __init__(self):
         self.template_scraper = None
         self.uoc_data = None
@@ -30,11 +40,17 @@ class UoCCreator:
         return bool(re.match(r"e\d{7}", username))
     
     def setup_templates(self, force_download: bool = False):
-        """Set up templates by downloading from VU intranet"""
+        """
+        Set up templates by downloading from VU intranet
+        
+        Args:
+            force_download: Download every template instead of only those that changed
+        """
         username = input("Enter your staff e-number: ")
         if not self.validate_staff_id(username):
             raise ValueError("Invalid staff ID format")
         
+        from .template_scraper import TemplatesScraper
         self.template_scraper = TemplatesScraper()
         
         while True:
@@ -51,28 +67,268 @@ class UoCCreator:
             print("Authorization failed. Please check your credentials and try again.")
         
         # Download templates
-        downloaded = self.template_scraper.download_all_templates()
-        return downloaded
+        if force_download:
+            return self.template_scraper.download_all_templates()
+        return self.template_scraper.sync_templates()
     
-    def prepare_unit(self, unit_code: str, additional_details: Optional[Dict] = None):
-        """Prepare all documentation for a unit"""
+    def prepare_unit(self, unit_code: str, additional_details: Optional[Dict] = None, force: bool = False):
+        """Prepare all documentation for a unit, skipping outputs whose inputs are unchanged"""
         self.unit_code = unit_code
+        self.uoc_data = self.fetch_unit(unit_code, force)
+        self.render_unit(unit_code, self.uoc_data, self._template_details(additional_details), force)
+    
+    def _template_details(self, additional_details: Optional[Dict] = None) -> Dict:
+        """Merge additional details over the default template details"""
+        template_details = self.DEFAULT_DETAILS.copy()
+        if additional_details:
+            template_details.update(additional_details)
+        return template_details
+    
+    @classmethod
+    def fetch_unit(cls, unit_code: str, force: bool = False, save: bool = True,
+                   unit_paths: Optional[List[str]] = None) -> Dict:
+        """
+        Fetch and extract the data for a unit, saving its JSON and indexing it if it changed
         
-        # Get UoC data
-        uoc = UoCData(unit_code)
-        self.uoc_data = uoc.extract_all()
-        uoc.save_to_file()  # Save JSON for reference
+        Args:
+            save: Write the details JSON beside the unit's documents
+            unit_paths: Folders the unit's documents go to (defaults to the unit's folder under Units)
+        """
+        from .uoc_scraper import UoCData
+        if UoCData.store is not None:
+            uoc = UoCData.from_store(unit_code)
+        else:
+            uoc = UoCData(unit_code)
+        uoc_data = uoc.extract_all()
         
-        # Prepare context for templates
-        if additional_details is None:
-            additional_details = {}
+        data_hash = hash_json(uoc_data)
+        if save:
+            for unit_path in unit_paths or [unit_path_from_code(unit_code)]:
+                manifest = UnitManifest(unit_path)
+                output = FileNames.Details.format(unit_code=unit_code)
+                inputs = {'xml': uoc.xml_hash, 'data': data_hash}
+                if force or not manifest.is_current(output, inputs):
+                    uoc.save_to_file(unit_path)  # Save JSON for reference
+                    manifest.record(output, inputs)
+        if cls.search_index is not None:
+            with instrumentation.span('index', unit_code=unit_code):
+                cls.search_index.update(uoc_data, data_hash)
+        return uoc_data
+    
+    @staticmethod
+    def render_unit(unit_code: str, uoc_data: Dict, template_details: Dict, force: bool = False,
+                    unit_path: Optional[str] = None) -> bool:
+        """
+        Render all templates for a unit from its extracted data
         
-        template_details = self.DEFAULT_DETAILS.copy()
-        template_details.update(additional_details)
+        Args:
+            unit_path: Output directory (defaults to the unit's folder under Units)
+        
+        Returns:
+            False if the documents were up to date and rendering was skipped
+        """
+        from .template_preparer import TemplatePreparer
+        preparer = TemplatePreparer(unit_code, uoc_data, template_details, unit_path)
+        
+        manifest = UnitManifest(preparer.unit_path)
+        inputs = {
+            'data': hash_json(uoc_data),
+            'template': hash_file(preparer.assessment_mapping_template),
+            'details': hash_json(template_details),
+        }
+        if not force and manifest.is_current(FileNames.Assessment_Mapping, inputs):
+            return False
         
-        # Prepare templates
-        preparer = TemplatePreparer(unit_code, self.uoc_data, template_details)
         preparer.prepare_all_templates()
+        manifest.record(FileNames.Assessment_Mapping, inputs)
+        return True
+    
+    @staticmethod
+    def render_unit_bytes(unit_code: str, uoc_data: Dict, template_details: Dict) -> bytes:
+        """Render the Assessment Mapping for a unit and return it as .docx bytes, without writing files"""
+        from .template_preparer import TemplatePreparer
+        return TemplatePreparer(unit_code, uoc_data, template_details).render_assessment_mapping()
+    
+    def prepare_units(self, unit_codes: Iterable[str], additional_details: Optional[Dict] = None,
+                      jobs: int = 1, fetch_workers: int = 8, on_result=None,
+                      force: bool = False, bundle=None) -> Dict[str, Optional[Exception]]:
+        """
+        Prepare documentation for many units
+        
+        Network fetches are overlapped on a pool of ``fetch_workers`` threads and
+        each unit is rendered as soon as its data arrives, on ``jobs`` worker
+        processes. A failing unit does not abort the rest of the batch.
+        
+        Args:
+            unit_codes: Unit codes to process (duplicates are ignored)
+            additional_details: Additional template details applied to every unit
+            jobs: Number of processes used for rendering documents
+            fetch_workers: Number of threads used for fetching unit data
+            on_result: Optional callback ``(unit_code, error)`` called as each unit finishes
+            force: Regenerate outputs even if their inputs are unchanged
+            bundle: Optional bundle.BundleWriter receiving every output instead of the Units folder
+        
+        Returns:
+            Mapping of unit code to the exception raised for it, or None on success
+        """
+        template_details = self._template_details(additional_details)
+        targets = {code: [(code, template_details, None)] for code in unit_codes}
+        return self._prepare_targets(targets, jobs, fetch_workers, on_result, force, bundle)
+    
+    def prepare_qualifications(self, qualification_codes: Iterable[str], additional_details: Optional[Dict] = None,
+                               jobs: int = 1, fetch_workers: int = 8, on_result=None,
+                               force: bool = False, bundle=None) -> Dict[str, Optional[Exception]]:
+        """
+        Prepare documentation for every core and elective unit of some qualifications
+        
+        Each qualification's packaging rules are read from training.gov.au, and its
+        units are rendered with its code and title as the course details, into
+        Units/<QUALIFICATION>/<UNIT> with their details JSON. A unit shared by
+        several qualifications is fetched and extracted only once.
+        
+        Args:
+            qualification_codes: Qualification codes to process (duplicates are ignored)
+            additional_details: Additional template details (the course code and title are replaced)
+            jobs: Number of processes used for rendering documents
+            fetch_workers: Number of threads used for fetching qualifications and unit data
+            on_result: Optional callback ``(name, error)`` called as each qualification that
+                could not be read, and each ``QUALIFICATION/UNIT``, finishes
+            force: Regenerate outputs even if their inputs are unchanged
+            bundle: Optional bundle.BundleWriter receiving every output instead of the Units folder
+        
+        Returns:
+            Mapping of each failed qualification code, and each ``QUALIFICATION/UNIT``,
+            to the exception raised for it, or None on success
+        """
+        from .qualification import Qualification
+        
+        qualification_codes = list(dict.fromkeys(qualification_codes))
+        results, targets = {}, {}
+        with ThreadPoolExecutor(max_workers=max(1, fetch_workers)) as pool:
+            fetches = {code: pool.submit(Qualification.fetch, code) for code in qualification_codes}
+        
+        for code, future in fetches.items():
+            try:
+                qualification = future.result()
+            except Exception as e:
+                results[code] = e
+                if on_result is not None:
+                    on_result(code, e)
+                continue
+            
+            template_details = self._template_details({
+                **(additional_details or {}),
+                'course_code': qualification.code,
+                'course_title': qualification.title,
+            })
+            for unit_code in qualification.unit_codes:
+                targets.setdefault(unit_code, []).append((
+                    f"{qualification.code}/{unit_code}",
+                    template_details,
+                    os.path.join(unit_path_from_code(qualification.code), unit_code),
+                ))
+        
+        results.update(self._prepare_targets(targets, jobs, fetch_workers, on_result, force, bundle))
+        return results
+    
+    def _prepare_targets(self, targets: Dict[str, list], jobs: int, fetch_workers: int,
+                         on_result, force: bool, bundle=None) -> Dict[str, Optional[Exception]]:
+        """
+        Fetch each unit once and render it for each of its targets
+        
+        Work is pipelined with a bounded window: new fetches are only started
+        while few renders are waiting, so memory is bounded by the number of
+        units in flight rather than the size of the batch.
+        
+        Args:
+            targets: Mapping of unit code to a list of ``(name, template_details, unit_path)``
+            bundle: Optional bundle.BundleWriter receiving every output instead of the Units folder
+        
+        Returns:
+            Mapping of target name to the exception raised for it, or None on success
+        """
+        results = {}
+        
+        def finish(name, error=None):
+            results[name] = error
+            if on_result is not None:
+                on_result(name, error)
+        
+        def archive_path(unit_code, unit_path, file_name):
+            return os.path.join(os.path.relpath(unit_path or unit_path_from_code(unit_code), Paths.Units), file_name)
+        
+        def render_args(unit_code, uoc_data, template_details, unit_path):
+            if bundle is not None:
+                return (self.render_unit_bytes, unit_code, uoc_data, template_details)
+            return (self.render_unit, unit_code, uoc_data, template_details, force, unit_path)
+        
+        def rendered(name, unit_code, unit_path, result):
+            if bundle is not None:
+                bundle.add(archive_path(unit_code, unit_path, FileNames.Assessment_Mapping), result)
+            finish(name)
+        
+        render_pool = ProcessPoolExecutor(max_workers=jobs) if jobs > 1 else None
+        # Spans recorded in worker processes are sent back and replayed here
+        profiling = instrumentation.enabled()
+        max_fetches = max(1, fetch_workers)
+        max_renders = max(1, jobs) * 2
+        pending_codes = iter(targets)
+        fetches, renders = {}, {}
+        try:
+            with ThreadPoolExecutor(max_workers=max_fetches) as fetch_pool:
+                while True:
+                    while len(fetches) < max_fetches and len(renders) < max_renders:
+                        unit_code = next(pending_codes, None)
+                        if unit_code is None:
+                            break
+                        unit_paths = [unit_path or unit_path_from_code(unit_code)
+                                      for _, _, unit_path in targets[unit_code]]
+                        future = fetch_pool.submit(self.fetch_unit, unit_code, force, bundle is None, unit_paths)
+                        fetches[future] = unit_code
+                    if not fetches and not renders:
+                        break
+                    
+                    done, _ = wait(list(fetches) + list(renders), return_when=FIRST_COMPLETED)
+                    for future in done:
+                        if future in renders:
+                            name, unit_code, unit_path = renders.pop(future)
+                            try:
+                                result = future.result()
+                                if profiling:
+                                    instrumentation.replay(result[1])
+                                    result = result[0]
+                                rendered(name, unit_code, unit_path, result)
+                            except Exception as e:
+                                finish(name, e)
+                            continue
+                        
+                        unit_code = fetches.pop(future)
+                        try:
+                            uoc_data = future.result()
+                        except Exception as e:
+                            for name, _, _ in targets[unit_code]:
+                                finish(name, e)
+                            continue
+                        for name, template_details, unit_path in targets[unit_code]:
+                            if bundle is not None:
+                                details_name = FileNames.Details.format(unit_code=unit_code)
+                                bundle.add_json(archive_path(unit_code, unit_path, details_name), uoc_data)
+                            args = render_args(unit_code, uoc_data, template_details, unit_path)
+                            if render_pool is None:
+                                try:
+                                    rendered(name, unit_code, unit_path, args[0](*args[1:]))
+                                except Exception as e:
+                                    finish(name, e)
+                            else:
+                                if profiling:
+                                    args = (instrumentation.capture,) + args
+                                renders[render_pool.submit(*args)] = (name, unit_code, unit_path)
+        finally:
+            if render_pool is not None:
+                render_pool.shutdown()
+        
+        # Report in the order the targets were given
+        return {name: results[name] for entries in targets.values() for name, _, _ in entries}
     
     @classmethod
     def interactive_prepare_unit(cls):
@@ -85,7 +341,7 @@ class UoCCreator:
             if not unit_code:
                 raise InterruptedError("Input aborted by user")
             
-            if UoCData.validate_unit_code(unit_code):
+            if validate_unit_code(unit_code):
                 break
             print("Invalid unit code format. Please try again.")
         
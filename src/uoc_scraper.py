@@ -4,59 +4,336 @@ Module for scraping Unit of Competency data from training.gov.au
 import json
 import os
 import re
+from typing import Dict, Iterable, Optional
 
 import requests
 from lxml import etree
 
-from .utils import get_unit_xml_url, namespaces, unit_path_from_code
+from .http_client import get_client
+from .instrumentation import span
+from .manifest import hash_bytes
+from .models import FIELDS
+from .release_index import ReleaseIndex
+from .utils import FileNames, get_unit_xml_url, namespaces, unit_path_from_code, validate_unit_code
+from .xml_cache import CacheEntry, XMLCache
+from .xml_stream import BOOK_TAG, DESCRIPTION_TAG, TOPIC_TAG, HashingReader, book_title, parse_unit_stream
+
+# Description of the Topic each field is read from; unit_title comes from the release Book
+FIELD_TOPICS = {
+    'elements': 'Elements and Performance Criteria',
+    'foundational_skills': 'Foundation Skills',
+    'performance_evidence': 'Performance Evidence',
+    'knowledge_evidence': 'Knowledge Evidence',
+    'assessment_conditions': 'Assessment Conditions',
+}
+
+# Descriptions of the Topics that extract_all reads
+SECTION_TOPICS = tuple(FIELD_TOPICS.values())
+
+# XPath expressions are compiled once and shared by every instance
+_xp_element_rows = etree.XPath('./a:Text/a:table/a:tr[position() > 2]', namespaces=namespaces)
+_xp_skill_rows = etree.XPath('./a:Text/a:table/a:tr[position() > 1]', namespaces=namespaces)
+_xp_cells = etree.XPath('./a:td', namespaces=namespaces)
+_xp_first_cell_text = etree.XPath('./a:td[1]/a:p/text()', namespaces=namespaces)
+_xp_second_cell_text = etree.XPath('./a:td[2]/a:p/text()', namespaces=namespaces)
+_xp_last_cell_text = etree.XPath('./a:td[last()]/a:p/text()', namespaces=namespaces)
+_xp_topic_text = etree.XPath('./a:Text/a:p/text()', namespaces=namespaces)
 
 
 class UoCData:
     """Class for fetching and parsing Unit of Competency data"""
     
-    @staticmethod
-    def validate_unit_code(unit_code: str) -> bool:
-        """Validate unit code format"""
-        return bool(re.match(r'[A-Z]{3}[A-Z]{3}\d{3}', unit_code))
+    # Shared cache of downloaded XML, replaced to change caching behaviour
+    cache = XMLCache()
+    
+    # Shared index of the latest release of each unit
+    releases = ReleaseIndex()
+    
+    # Local unit store (see unit_store.UnitStore) that UoCCreator reads from instead of the network
+    store = None
     
-    def __init__(self, unit_code: str):
+    # Parse incrementally, keeping only the extracted sections in memory
+    streaming = True
+    
+    # Hash of the complete XML this instance was built from
+    xml_hash = None
+    
+    # Fields parsed from the XML, or None for all of them
+    fields = None
+    
+    # Per-instance memos, filled on first use
+    _topics = None
+    _books = None
+    _walker = None
+    _sections = None
+    _data = None
+    
+    validate_unit_code = staticmethod(validate_unit_code)
+    
+    def __init__(self, unit_code: str, cache: XMLCache = None, release: int = None,
+                 fields: Optional[Iterable[str]] = None):
+        """
+        Fetch and parse a unit
+        
+        Args:
+            fields: Only parse the sections holding these fields (defaults to all);
+                the others cannot be extracted afterwards
+        """
         if not self.validate_unit_code(unit_code):
             raise ValueError("Invalid unit code format")
+        self.fields = self._check_fields(fields)
         self.unit_code = unit_code
         self.root = None
+        with span('resolve_release', unit_code=unit_code):
+            self.release = release or self.releases.latest(unit_code)
+        if cache is not None:
+            self.cache = cache
         self._fetch_xml()
     
+    @classmethod
+    def configure(cls, ttl: float = XMLCache.DEFAULT_TTL, offline: bool = False, enabled: bool = True,
+                  from_store: bool = False, store_path: str = None):
+        """
+        Point every instance at a shared XML cache, release index and optional unit store
+        
+        Args:
+            ttl: Seconds cached XML and known releases are used without revalidation
+            offline: Never touch the network
+            enabled: Whether the XML cache and release index are used at all
+            from_store: Read units from the local unit store instead of training.gov.au
+            store_path: Unit store database (defaults to Cache/units.db)
+        """
+        cls.cache = XMLCache(ttl=ttl, offline=offline, enabled=enabled)
+        cls.releases = ReleaseIndex(ttl=ttl, offline=offline, enabled=enabled)
+        if from_store:
+            from .unit_store import UnitStore
+            cls.store = UnitStore(store_path)
+    
+    @classmethod
+    def from_xml(cls, unit_code: str, content: bytes, release: int = 1, fields: Optional[Iterable[str]] = None):
+        """Create an instance from already downloaded XML, without any network access"""
+        uoc = cls.__new__(cls)
+        uoc.unit_code = unit_code
+        uoc.release = release
+        uoc.fields = cls._check_fields(fields)
+        # Parsing bytes already in memory in one call is faster than streaming only some sections
+        uoc.root = etree.fromstring(content)
+        uoc.xml_hash = hash_bytes(content)
+        return uoc
+    
+    @classmethod
+    def from_stream(cls, unit_code: str, source, release: int = 1, fields: Optional[Iterable[str]] = None):
+        """
+        Create an instance by streaming XML from a file name, a binary file-like object,
+        or a cache entry or streaming response from open_xml (which is closed once parsed)
+        """
+        uoc = cls.__new__(cls)
+        uoc.unit_code = unit_code
+        uoc.release = release
+        uoc.fields = cls._check_fields(fields)
+        uoc._parse_source(source)
+        return uoc
+    
+    @staticmethod
+    def _check_fields(fields: Optional[Iterable[str]]):
+        """Check requested field names, returning them without duplicates, or None for all fields"""
+        if fields is None:
+            return None
+        fields = list(dict.fromkeys(fields))
+        unknown = [field for field in fields if field not in FIELDS]
+        if unknown:
+            raise ValueError(f"Unknown fields: {', '.join(unknown)}. Valid fields: {', '.join(FIELDS)}")
+        return fields
+    
+    def _wanted_sections(self):
+        """Topics to keep when parsing, and whether the title Book is needed"""
+        fields = FIELDS if self.fields is None else self.fields
+        return [FIELD_TOPICS[field] for field in fields if field in FIELD_TOPICS], 'unit_title' in fields
+    
+    @classmethod
+    def from_store(cls, unit_code: str, store=None, release: int = None):
+        """Create an instance from data extracted into a unit store, without any XML"""
+        store = store or cls.store
+        with span('fetch', unit_code=unit_code):
+            stored = store.get(unit_code, release)
+        if stored is None:
+            raise ValueError(f"Unit code {unit_code} is not in the unit store")
+        uoc = cls.__new__(cls)
+        uoc.unit_code = unit_code
+        uoc.release = stored.release
+        uoc.root = None
+        uoc.xml_hash = stored.xml_hash
+        uoc._data = stored.data
+        return uoc
+    
+    def _parse_stream(self, source):
+        """
+        Parse XML incrementally from a file name or binary file-like object
+        
+        xml_hash is always the hash of the whole document: parsing stops at the last
+        wanted section, and the rest is then read through the hash.
+        """
+        if isinstance(source, (str, os.PathLike)):
+            with open(source, 'rb') as f:
+                return self._parse_stream(f)
+        reader = HashingReader(source)
+        self.root = parse_unit_stream(reader, *self._wanted_sections())
+        for _ in iter(lambda: reader.read(64 * 1024), b''):
+            pass
+        self.xml_hash = reader.hexdigest()
+    
+    def _parse_source(self, source):
+        """Parse a file name, binary file-like object, cache entry or streaming response"""
+        if isinstance(source, CacheEntry):
+            if source.sha256 is None:
+                return self._parse_stream(source.xml_path)
+            # The cache hashed the XML as it was stored, so reading can stop at the last wanted section
+            with open(source.xml_path, 'rb') as f:
+                self.root = parse_unit_stream(f, *self._wanted_sections())
+            self.xml_hash = source.sha256
+            return
+        if isinstance(source, requests.Response):
+            with source:
+                source.raw.decode_content = True
+                return self._parse_stream(source.raw)
+        return self._parse_stream(source)
+    
     def _fetch_xml(self):
-        """Fetch XML data from training.gov.au"""
-        url = get_unit_xml_url(self.unit_code)
-        response = requests.get(url)
-        
-        if response.status_code == 200:
-            self.root = etree.fromstring(response.content)
-        elif response.status_code == 404:
-            raise ValueError(f"Unit code {self.unit_code} not found")
-        else:
-            raise Exception(f"Failed to retrieve XML. Status code: {response.status_code}")
+        """Fetch and parse XML data"""
+        if not self.streaming:
+            content = self.fetch_content(self.unit_code, self.release, self.cache)
+            with span('parse', unit_code=self.unit_code):
+                self.root = etree.fromstring(content)
+                self.xml_hash = hash_bytes(content)
+            return
+        
+        source = self.open_xml(self.unit_code, self.release, self.cache)
+        with span('parse', unit_code=self.unit_code):
+            self._parse_source(source)
+    
+    @classmethod
+    def open_xml(cls, unit_code: str, release: int, cache: XMLCache):
+        """
+        Get a unit's XML ready to be streamed into the parser
+        
+        Returns:
+            The cache entry, after revalidating or downloading it as needed, or, when
+            the cache is disabled, the open streaming response, so the parser reads
+            straight off the socket (from_stream closes it)
+        """
+        entry = cache.get(unit_code, release)
+        if entry is not None and (cache.offline or cache.is_fresh(entry)):
+            return entry
+        if cache.offline:
+            raise ValueError(f"Unit code {unit_code} is not cached (offline mode)")
+        
+        with span('fetch', unit_code=unit_code):
+            response = cls._request(unit_code, release, cache, entry, stream=True)
+        if not cache.enabled:
+            return response
+        with response:
+            if response.status_code == 304:
+                cache.touch(entry)
+                return entry
+            with span('fetch', unit_code=unit_code):
+                entry = cache.store_stream(
+                    unit_code, release, response.iter_content(64 * 1024), response.headers, response.url
+                )
+        return entry
+    
+    @staticmethod
+    def _request(unit_code: str, release: int, cache: XMLCache, entry=None, stream: bool = False):
+        """Request unit XML from training.gov.au, revalidating any cached entry"""
+        url = get_unit_xml_url(unit_code, release)
+        response = get_client().get(url, headers=cache.conditional_headers(entry), stream=stream)
+        
+        if response.status_code == 200 or (response.status_code == 304 and entry is not None):
+            return response
+        response.close()
+        if response.status_code == 404:
+            raise ValueError(f"Unit code {unit_code} not found")
+        raise Exception(f"Failed to retrieve XML. Status code: {response.status_code}")
+    
+    @classmethod
+    def fetch_content(cls, unit_code: str, release: int = None, cache: XMLCache = None) -> bytes:
+        """Fetch raw XML data from the cache or training.gov.au, for the latest release by default"""
+        if cache is None:
+            cache = cls.cache
+        if release is None:
+            release = cls.releases.latest(unit_code)
+        
+        with span('fetch', unit_code=unit_code):
+            return cls._fetch_content(unit_code, release, cache)
+    
+    @classmethod
+    def _fetch_content(cls, unit_code: str, release: int, cache: XMLCache) -> bytes:
+        entry = cache.get(unit_code, release)
+        if entry is not None and (cache.offline or cache.is_fresh(entry)):
+            return entry.read()
+        if cache.offline:
+            raise ValueError(f"Unit code {unit_code} is not cached (offline mode)")
+        
+        response = cls._request(unit_code, release, cache, entry)
+        if response.status_code == 304:
+            cache.touch(entry)
+            return entry.read()
+        cache.store(unit_code, release, response.content, response.headers, response.url)
+        return response.content
+
+    def _index_until(self, done):
+        """
+        Index Topics by the text of their Descriptions, and collect Books, in one walk of the tree
+        
+        The walk is resumed only as far as needed, stopping as soon as done()
+        is true, so extracting a few sections does not visit the whole tree.
+        """
+        if self._topics is None:
+            self._topics = {}
+            self._books = []
+            self._walker = self.root.iter(TOPIC_TAG, BOOK_TAG)
+        while not done():
+            node = next(self._walker, None)
+            if node is None:
+                return
+            if node.tag == BOOK_TAG:
+                self._books.append(node)
+                continue
+            for description in node.iter(DESCRIPTION_TAG):
+                # Keep the first match in document order, as an XPath [0] would
+                self._topics.setdefault(description.text, node)
+
+    def _topic(self, topic_title):
+        """Get the Topic with the given Description"""
+        self._index_until(lambda: topic_title in self._topics)
+        try:
+            return self._topics[topic_title]
+        except KeyError:
+            raise ValueError(f"Section '{topic_title}' not found for unit {self.unit_code}") from None
 
     def _extract_unit_title(self):
         """Extract unit title from XML"""
-        xpath = './/a:Book[.//a:Description[contains(text(), "Release")]]//a:VariableAssignments/a:VariableAssignment[./a:Name/text()="Title"]/a:Value/text()'
-        return self.root.xpath(xpath, namespaces=namespaces)[0]
+        checked = 0
+        while True:
+            self._index_until(lambda: self._books is not None and len(self._books) > checked)
+            if len(self._books) == checked:
+                raise ValueError(f"Unit title not found for unit {self.unit_code}")
+            for book in self._books[checked:]:
+                title = book_title(book)
+                if title is not None:
+                    return title
+            checked = len(self._books)
 
     def _extract_elements(self):
         """Extract elements and performance criteria"""
-        xpath = './/a:Topic[.//a:Description[text()="Elements and Performance Criteria"]]'
-        topic = self.root.xpath(xpath, namespaces=namespaces)[0]
-        rows = topic.xpath('./a:Text/a:table/a:tr[position() > 2]', namespaces=namespaces)
+        rows = _xp_element_rows(self._topic('Elements and Performance Criteria'))
         
         elements = []
         for row in rows:
-            element = row.xpath('./a:td[1]/a:p/text()', namespaces=namespaces)[0]
-            element_index, element_title = re.split(r'\.\s*', element, 1)
-            performance_criteria = row.xpath('./a:td[2]/a:p/text()', namespaces=namespaces)
+            element = _xp_first_cell_text(row)[0]
+            element_index, element_title = re.split(r'\.\s*', element, maxsplit=1)
             
             pc_items = []
-            for pc in performance_criteria:
+            for pc in _xp_second_cell_text(row):
                 index, description = pc.split(' ', 1)
                 pc_items.append({'index': index, 'description': description})
             
@@ -70,18 +347,17 @@ class UoCData:
 
     def _extract_foundation_skills(self):
         """Extract foundation skills"""
-        xpath = './/a:Topic[.//a:Description[text()="Foundation Skills"]]'
-        topic = self.root.xpath(xpath, namespaces=namespaces)[0]
-        rows = topic.xpath('./a:Text/a:table/a:tr[position() > 1]', namespaces=namespaces)
+        rows = _xp_skill_rows(self._topic('Foundation Skills'))
         
         skills = []
         for row in rows:
-            skill = row.xpath('./a:td[1]/a:p/text()', namespaces=namespaces)[0]
-            descriptions = row.xpath('./a:td[last()]/a:p/text()', namespaces=namespaces)
+            skill = _xp_first_cell_text(row)[0]
+            descriptions = _xp_last_cell_text(row)
             
+            # A middle column, when present, lists the related performance criteria
             pc_references = []
-            if row.xpath('./a:td[2]', namespaces=namespaces) != row.xpath('./a:td[last()]', namespaces=namespaces):
-                pc_references = row.xpath('./a:td[2]/a:p/text()', namespaces=namespaces)[0].split(', ')
+            if len(_xp_cells(row)) > 2:
+                pc_references = _xp_second_cell_text(row)[0].split(', ')
             
             skills.append({
                 'skill': skill,
@@ -93,22 +369,78 @@ class UoCData:
 
     def _extract_topic_text(self, topic_title):
         """Extract text content from a topic"""
-        xpath = f'.//a:Topic[.//a:Description[text()="{topic_title}"]]'
-        topic = self.root.xpath(xpath, namespaces=namespaces)[0]
-        return topic.xpath('./a:Text/a:p/text()', namespaces=namespaces)
+        return _xp_topic_text(self._topic(topic_title))
 
+    # How each field is extracted from the parsed XML
+    _extractors = {
+        'unit_title': _extract_unit_title,
+        'elements': _extract_elements,
+        'foundational_skills': _extract_foundation_skills,
+        'performance_evidence': lambda self: self._extract_topic_text(FIELD_TOPICS['performance_evidence']),
+        'knowledge_evidence': lambda self: self._extract_topic_text(FIELD_TOPICS['knowledge_evidence']),
+        'assessment_conditions': lambda self: self._extract_topic_text(FIELD_TOPICS['assessment_conditions']),
+    }
+    
+    def _section(self, field: str):
+        """Extract one field, computed once per instance"""
+        if field == 'unit_code':
+            return self.unit_code
+        if self._data is not None:
+            return self._data[field]
+        if self._sections is None:
+            self._sections = {}
+        if field not in self._sections:
+            if self.fields is not None and field not in self.fields:
+                raise ValueError(f"Field '{field}' was not parsed for unit {self.unit_code}")
+            self._sections[field] = self._extractors[field](self)
+        return self._sections[field]
+    
+    @property
+    def unit_title(self) -> str:
+        return self._section('unit_title')
+    
+    @property
+    def elements(self) -> list:
+        return self._section('elements')
+    
+    @property
+    def foundational_skills(self) -> list:
+        return self._section('foundational_skills')
+    
+    @property
+    def performance_evidence(self) -> list:
+        return self._section('performance_evidence')
+    
+    @property
+    def knowledge_evidence(self) -> list:
+        return self._section('knowledge_evidence')
+    
+    @property
+    def assessment_conditions(self) -> list:
+        return self._section('assessment_conditions')
+    
+    def extract(self, fields: Optional[Iterable[str]] = None) -> Dict:
+        """
+        Extract only some of the UoC data, leaving the other sections unread
+        
+        Args:
+            fields: Field names from models.FIELDS, in the order wanted (defaults to all)
+        
+        Returns:
+            Dict of the requested fields, keyed as in extract_all
+        """
+        fields = self._check_fields(fields)
+        if fields is None:
+            return self.extract_all()
+        with span('extract', unit_code=self.unit_code):
+            return {field: self._section(field) for field in fields}
+    
     def extract_all(self):
-        """Extract all UoC data"""
-        data = {
-            'unit_code': self.unit_code,
-            'unit_title': self._extract_unit_title(),
-            'elements': self._extract_elements(),
-            'foundational_skills': self._extract_foundation_skills(),
-            'performance_evidence': self._extract_topic_text('Performance Evidence'),
-            'knowledge_evidence': self._extract_topic_text('Knowledge Evidence'),
-            'assessment_conditions': self._extract_topic_text('Assessment Conditions')
-        }
-        return data
+        """Extract all UoC data, computed once per instance"""
+        if self._data is None:
+            with span('extract', unit_code=self.unit_code):
+                self._data = {field: self._section(field) for field in FIELDS}
+        return self._data
 
     def save_to_file(self, folder_path=None):
         """Save extracted data to JSON file"""
@@ -116,9 +448,10 @@ class UoCData:
             folder_path = unit_path_from_code(self.unit_code)
         
         os.makedirs(folder_path, exist_ok=True)
-        filename = os.path.join(folder_path, f"{self.unit_code}_details.json")
+        filename = os.path.join(folder_path, FileNames.Details.format(unit_code=self.unit_code))
         
-        with open(filename, 'w') as f:
-            json.dump(self.extract_all(), f, indent=2)
+        data = self.extract_all()
+        with span('save_json', unit_code=self.unit_code), open(filename, 'w') as f:
+            json.dump(data, f, indent=2)
         
         return filename
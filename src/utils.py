@@ -3,11 +3,15 @@ Utility functions and constants shared across modules
 """
 import os
 import pathlib
+import re
 
 # VU Template URLs
 base_url = "https://intranet.vu.edu.au/TAFE/"
 templates_url = base_url + "pageTemplates.asp"
 
+# training.gov.au location of unit XML exports
+tga_assets_url = "https://training.gov.au/assets/"
+
 # XML namespaces for parsing training.gov.au data
 namespaces = {
     "a": "http://www.authorit.com/xml/authorit",
@@ -32,6 +36,7 @@ template_titles = [
 class FileNames:
     """Constants for file names used in the project"""
     Assessment_Mapping = "VETAssessmentMapping(CurrentUoC).docx"
+    Details = "{unit_code}_details.json"
 
 class Paths:
     """Class managing paths used in the project"""
@@ -45,15 +50,23 @@ class Paths:
         self.Templates = os.path.join(base_dir, "Templates")
         self.Jinja_Templates = os.path.join(self.Templates, "Jinja")
         self.VU_Templates = os.path.join(self.Templates, "VU")
+        self.Cache = os.path.join(base_dir, "Cache")
+        self.XML_Cache = os.path.join(self.Cache, "xml")
+        self.Unit_Store = os.path.join(self.Cache, "units.db")
+        self.Search_Index = os.path.join(self.Cache, "search.db")
 
 # Initialize paths relative to project root
 Paths = Paths()
 
+def validate_unit_code(unit_code: str) -> bool:
+    """Validate unit code format"""
+    return bool(re.match(r'[A-Z]{3}[A-Z]{3}\d{3}', unit_code))
+
 def unit_path_from_code(unit_code: str) -> str:
     """Get the path to a unit's directory from its code"""
     return os.path.join(Paths.Units, unit_code)
 
-def get_unit_xml_url(unit_code: str) -> str:
-    """Get the URL of the XML file for a unit code from training.gov.au"""
+def get_unit_xml_url(unit_code: str, release: int = 1) -> str:
+    """Get the URL of the XML file for a unit code and release from training.gov.au"""
     industry_code = unit_code[:3]
-    return f"https://training.gov.au/assets/{industry_code}/{unit_code}_Complete_R1.xml"
+    return f"{tga_assets_url}{industry_code}/{unit_code}_Complete_R{release}.xml"
@@ -0,0 +1,227 @@
+"""
+Module for caching training.gov.au XML on disk
+"""
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+import threading
+import time
+from typing import Dict, Iterable, Optional
+
+from .utils import Paths
+
+
+class CacheEntry:
+    """A cached XML payload and the response headers it was fetched with"""
+
+    def __init__(self, xml_path: str, meta: dict):
+        self.xml_path = xml_path
+        self.meta = meta
+
+    @property
+    def age(self) -> float:
+        """Seconds since the entry was last fetched or revalidated"""
+        return time.time() - self.meta.get('fetched_at', 0)
+
+    @property
+    def sha256(self) -> Optional[str]:
+        """Hash of the cached XML, taken as it was stored"""
+        return self.meta.get('sha256')
+
+    def read(self) -> bytes:
+        """Read the cached XML"""
+        with open(self.xml_path, 'rb') as f:
+            return f.read()
+
+
+class XMLCache:
+    """
+    On-disk cache of raw unit XML, keyed by unit code and release
+
+    Entries are served directly while younger than ``ttl`` seconds and are
+    revalidated with conditional requests (ETag/Last-Modified) after that.
+    """
+
+    DEFAULT_TTL = 24 * 60 * 60
+    DEFAULT_MAX_SIZE = 500 * 1024 * 1024
+
+    # Eviction frees space down to this fraction of max_size, so a full cache is not rescanned on every store
+    EVICT_TO = 0.9
+
+    def __init__(self, cache_dir: Optional[str] = None, ttl: float = DEFAULT_TTL,
+                 max_size: int = DEFAULT_MAX_SIZE, offline: bool = False, enabled: bool = True):
+        """
+        Initialize the XML cache
+
+        Args:
+            cache_dir: Directory for cached files (defaults to Cache/xml)
+            ttl: Seconds an entry is served without revalidation
+            max_size: Maximum total size of cached XML in bytes
+            offline: Never touch the network, serve cached entries regardless of age
+            enabled: Whether entries are read from and written to disk at all
+        """
+        self.cache_dir = cache_dir or Paths.XML_Cache
+        self.ttl = ttl
+        self.max_size = max_size
+        self.offline = offline
+        self.enabled = enabled
+        self._lock = threading.Lock()
+        # Running total of cached XML, counted once on the first store and kept up to date after that
+        self._total = None
+
+    def _base_path(self, unit_code: str, release: int) -> str:
+        return os.path.join(self.cache_dir, unit_code[:3], f"{unit_code}_R{release}")
+
+    def get(self, unit_code: str, release: int = 1) -> Optional[CacheEntry]:
+        """Get the cached entry for a unit release, if any"""
+        if not self.enabled:
+            return None
+
+        base_path = self._base_path(unit_code, release)
+        try:
+            with open(base_path + '.json') as f:
+                meta = json.load(f)
+        except (OSError, ValueError):
+            return None
+
+        xml_path = base_path + '.xml'
+        if not os.path.exists(xml_path):
+            return None
+
+        # Mark as recently used for eviction
+        try:
+            os.utime(xml_path)
+        except OSError:
+            pass
+        return CacheEntry(xml_path, meta)
+
+    def is_fresh(self, entry: CacheEntry) -> bool:
+        """Check whether an entry can be served without revalidation"""
+        return entry.age < self.ttl
+
+    @staticmethod
+    def conditional_headers(entry: Optional[CacheEntry]) -> Dict[str, str]:
+        """Build conditional request headers for revalidating an entry"""
+        headers = {}
+        if entry is None:
+            return headers
+        if entry.meta.get('etag'):
+            headers['If-None-Match'] = entry.meta['etag']
+        if entry.meta.get('last_modified'):
+            headers['If-Modified-Since'] = entry.meta['last_modified']
+        return headers
+
+    def store(self, unit_code: str, release: int, content: bytes, headers=None, url: str = None):
+        """Store a freshly downloaded payload with its validators"""
+        return self.store_stream(unit_code, release, [content], headers, url)
+
+    def store_stream(self, unit_code: str, release: int, chunks: Iterable[bytes], headers=None,
+                     url: str = None) -> Optional[CacheEntry]:
+        """Store a payload from an iterable of chunks without holding it all in memory"""
+        if not self.enabled:
+            return None
+
+        base_path = self._base_path(unit_code, release)
+        try:
+            replaced = os.path.getsize(base_path + '.xml')
+        except OSError:
+            replaced = 0
+        digest = hashlib.sha256()
+        size = self._write_atomic(base_path + '.xml', chunks, digest)
+        headers = headers or {}
+        meta = {
+            'url': url,
+            'etag': headers.get('ETag'),
+            'last_modified': headers.get('Last-Modified'),
+            'fetched_at': time.time(),
+            'size': size,
+            'sha256': digest.hexdigest(),
+        }
+        self._write_atomic(base_path + '.json', [json.dumps(meta).encode()])
+        with self._lock:
+            if self._total is None:
+                self._total = self.size()
+            else:
+                self._total += size - replaced
+            full = self._total > self.max_size
+        # Only a cache that has outgrown max_size is walked, rather than on every store
+        if full:
+            self.evict(keep=base_path + '.xml')
+        return CacheEntry(base_path + '.xml', meta)
+
+    def touch(self, entry: CacheEntry):
+        """Record a successful revalidation (HTTP 304) of an entry"""
+        entry.meta['fetched_at'] = time.time()
+        self._write_atomic(entry.xml_path[:-len('.xml')] + '.json', [json.dumps(entry.meta).encode()])
+
+    @staticmethod
+    def _write_atomic(path: str, chunks: Iterable[bytes], digest=None) -> int:
+        """Write a file via a temp file so readers never see partial content, updating digest if given"""
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        fd, temp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix='.tmp')
+        size = 0
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                for chunk in chunks:
+                    f.write(chunk)
+                    size += len(chunk)
+                    if digest is not None:
+                        digest.update(chunk)
+            os.replace(temp_path, path)
+            return size
+        except Exception:
+            try:
+                os.remove(temp_path)
+            except OSError:
+                pass
+            raise
+
+    def size(self) -> int:
+        """Total size of cached XML in bytes"""
+        return sum(os.path.getsize(path) for path in self._xml_files())
+
+    def _xml_files(self):
+        for dir_path, _, file_names in os.walk(self.cache_dir):
+            for file_name in file_names:
+                if file_name.endswith('.xml'):
+                    yield os.path.join(dir_path, file_name)
+
+    def evict(self, keep: str = None):
+        """
+        Remove least recently used entries until the cache fits in max_size
+
+        When it does not fit, entries are removed until it is down to EVICT_TO of
+        max_size. The walk also recounts the running total, correcting any drift
+        from other processes writing to the same directory.
+        """
+        with self._lock:
+            files = []
+            for path in self._xml_files():
+                try:
+                    stat = os.stat(path)
+                except OSError:
+                    continue
+                files.append((stat.st_mtime, stat.st_size, path))
+
+            total = sum(size for _, size, _ in files)
+            target = self.max_size * self.EVICT_TO if total > self.max_size else self.max_size
+            for _, size, path in sorted(files):
+                if total <= target:
+                    break
+                if path == keep:
+                    continue
+                for stale in (path, path[:-len('.xml')] + '.json'):
+                    try:
+                        os.remove(stale)
+                    except OSError:
+                        pass
+                total -= size
+            self._total = total
+
+    def purge(self):
+        """Remove every cached entry"""
+        shutil.rmtree(self.cache_dir, ignore_errors=True)
+        with self._lock:
+            self._total = None
@@ -0,0 +1,120 @@
+"""
+Module for streaming the parts of a unit's Authorit XML that are extracted
+"""
+import hashlib
+from typing import Iterable
+
+from lxml import etree
+
+from .utils import namespaces
+
+ROOT_TAG = f"{{{namespaces['a']}}}AuthoritExport"
+TOPIC_TAG = f"{{{namespaces['a']}}}Topic"
+BOOK_TAG = f"{{{namespaces['a']}}}Book"
+DESCRIPTION_TAG = f"{{{namespaces['a']}}}Description"
+
+_xp_release_book = etree.XPath('self::a:Book[.//a:Description[contains(text(), "Release")]]', namespaces=namespaces)
+_xp_book_title = etree.XPath(
+    './/a:VariableAssignments/a:VariableAssignment[./a:Name/text()="Title"]/a:Value/text()',
+    namespaces=namespaces,
+)
+
+
+class HashingReader:
+    """Binary file-like wrapper that hashes everything read through it"""
+
+    def __init__(self, raw):
+        self.raw = raw
+        self.digest = hashlib.sha256()
+
+    def read(self, size: int = -1) -> bytes:
+        data = self.raw.read(size)
+        self.digest.update(data)
+        return data
+
+    def hexdigest(self) -> str:
+        return self.digest.hexdigest()
+
+
+def book_title(book):
+    """Get the unit title from a release Book, or None if the Book has none"""
+    if _xp_release_book(book):
+        titles = _xp_book_title(book)
+        if titles:
+            return titles[0]
+    return None
+
+
+def _discard(element):
+    """Free an element that is no longer needed"""
+    element.clear()
+    parent = element.getparent()
+    if parent is not None:
+        parent.remove(element)
+
+
+def parse_unit_stream(source, topics: Iterable[str], title: bool = True):
+    """
+    Incrementally parse unit XML, keeping only what extraction needs
+
+    Topics whose Description is in ``topics`` and the release Book carrying the
+    unit title are moved into a new, small root element. Everything else is
+    cleared as soon as it has been read, and reading stops once every wanted
+    section has been found.
+
+    Args:
+        source: File name or binary file-like object (e.g. an HTTP response stream)
+        topics: Descriptions of the Topics to keep
+        title: Whether to keep the Book holding the unit title
+
+    Returns:
+        Root element containing only the kept Topics and Book
+    """
+    wanted = set(topics)
+    found = set()
+    title_found = not title
+    root = etree.Element(ROOT_TAG, nsmap={None: namespaces['a']})
+
+    topic_depth = 0
+    book_depth = 0
+    context = etree.iterparse(source, events=('start', 'end'))
+    try:
+        for event, element in context:
+            tag = element.tag
+            if tag == TOPIC_TAG:
+                if event == 'start':
+                    topic_depth += 1
+                    continue
+                topic_depth -= 1
+                if topic_depth:
+                    continue  # Nested Topics are handled with their outermost Topic
+
+                names = {description.text for description in element.iter(DESCRIPTION_TAG)}
+                matches = (names & wanted) - found
+                if matches:
+                    found |= matches
+                    root.append(element)
+                else:
+                    _discard(element)
+
+            elif tag == BOOK_TAG and not topic_depth:
+                if event == 'start':
+                    book_depth += 1
+                    continue
+                book_depth -= 1
+                if not title_found and book_title(element) is not None:
+                    title_found = True
+                    root.append(element)
+                elif not book_depth:
+                    _discard(element)
+
+            elif event == 'end' and not topic_depth and not book_depth:
+                # Metadata outside Topics and Books is never extracted
+                _discard(element)
+
+            if title_found and found >= wanted:
+                break
+    finally:
+        del context
+
+    return root
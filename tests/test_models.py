@@ -0,0 +1,53 @@
+"""
+Tests for the unit data model
+"""
+import json
+
+import pytest
+
+from src.models import FIELDS, Element, FoundationSkill, PerformanceCriterion, Unit
+
+
+@pytest.fixture
+def unit():
+    return Unit(
+        "ABCDEF001",
+        "Title",
+        [Element("1", "Element", [PerformanceCriterion("1.1", "Criterion")])],
+        [FoundationSkill("Reading", ["1.1"], ["Reads procedures"])],
+        ["Performance"],
+        ["Knowledge"],
+        ["Conditions"],
+    )
+
+
+def test_record_keys_are_the_fields(unit):
+    assert list(unit) == list(FIELDS)
+    assert len(unit) == len(FIELDS)
+    assert "elements" in unit
+    assert "keys" not in unit
+    assert {**unit}["unit_title"] == "Title"
+
+
+def test_record_get_only_looks_up_fields(unit):
+    assert unit.get("unit_title") == "Title"
+    assert unit.get("keys") is None
+    assert unit.get("missing", "default") == "default"
+    with pytest.raises(KeyError):
+        unit["keys"]
+
+
+def test_compact_round_trip(unit):
+    assert Unit.loads(unit.dumps()) == unit
+    assert Unit.from_dict(Unit.loads(unit.dumps()).to_dict()) == unit
+
+
+def test_loads_reads_dict_json(unit):
+    assert Unit.loads(json.dumps(unit.to_dict())) == unit
+
+
+def test_loads_rejects_unknown_compact_version(unit):
+    compact = unit.to_compact()
+    compact[0] = "uoc0"
+    with pytest.raises(ValueError):
+        Unit.loads(json.dumps(compact))
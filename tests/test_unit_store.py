@@ -0,0 +1,45 @@
+"""
+Tests for the local unit store
+"""
+import json
+
+from src.unit_store import UnitStore
+
+
+def make_data(unit_code):
+    return {
+        'unit_code': unit_code,
+        'unit_title': "Title",
+        'elements': [{'index': '1', 'title': "Element",
+                      'performance_criteria': [{'index': '1.1', 'description': "Criterion"}]}],
+        'foundational_skills': [{'skill': "Reading", 'performance_criteria': ['1.1'],
+                                 'descriptions': ["Reads procedures"]}],
+        'performance_evidence': ["Performance"],
+        'knowledge_evidence': ["Knowledge"],
+        'assessment_conditions': ["Conditions"],
+    }
+
+
+def test_round_trip(tmp_path):
+    store = UnitStore(str(tmp_path / "units.db"))
+    store.put_many([("ABCDEF001", 1, "hash1", make_data("ABCDEF001"))])
+    stored = store.get("ABCDEF001")
+    assert stored.release == 1
+    assert stored.xml_hash == "hash1"
+    assert stored.data == make_data("ABCDEF001")
+
+
+def test_data_is_stored_compact(tmp_path):
+    store = UnitStore(str(tmp_path / "units.db"))
+    store.put_many([("ABCDEF001", 1, None, make_data("ABCDEF001"))])
+    text = store._connection().execute('SELECT data FROM units').fetchone()[0]
+    assert json.loads(text)[0] == "uoc1"
+    assert len(text) < len(json.dumps(make_data("ABCDEF001"), separators=(',', ':')))
+
+
+def test_reads_dict_rows(tmp_path):
+    store = UnitStore(str(tmp_path / "units.db"))
+    with store._connection() as connection:
+        connection.execute('INSERT INTO units VALUES (?, ?, ?, ?, ?, ?, ?)',
+                           ("ABCDEF001", 2, "ABC", "Title", None, json.dumps(make_data("ABCDEF001")), 0.0))
+    assert store.get("ABCDEF001", 2).data == make_data("ABCDEF001")
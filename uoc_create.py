@@ -3,9 +3,140 @@
 Command line interface for the UoC Creator
 """
 import argparse
+import cProfile
+import os
+import pstats
+import re
 import sys
+import tracemalloc
+from contextlib import ExitStack, contextmanager
 
 from src import UoCCreator
+from src import instrumentation
+from src.xml_cache import XMLCache
+
+
+def read_unit_codes(path: str) -> list:
+    """Read unit codes from a file, or from stdin when path is '-'"""
+    if path == "-":
+        text = sys.stdin.read()
+    else:
+        with open(path) as f:
+            text = f.read()
+
+    codes = []
+    for line in text.splitlines():
+        line = line.split("#", 1)[0]
+        codes.extend(code for code in re.split(r"[\s,]+", line) if code)
+    return codes
+
+
+def source_options(args) -> dict:
+    """Keyword arguments for UoCData.configure from the command line"""
+    return {
+        "ttl": args.cache_ttl,
+        "offline": args.offline,
+        "enabled": not args.no_cache,
+        "from_store": args.from_store,
+        "store_path": args.store,
+    }
+
+
+def configure_sources(args):
+    """Point UoCData at the XML cache, release index and unit store chosen on the command line"""
+    # Imported here so that commands which never fetch units do not load requests and lxml
+    from src.uoc_scraper import UoCData
+
+    UoCData.configure(**source_options(args))
+    return UoCData
+
+
+@contextmanager
+def profile_session(args):
+    """Record per-stage timings, and optionally a cProfile or tracemalloc capture, when --profile is set"""
+    if not args.profile:
+        yield
+        return
+
+    recorder = instrumentation.StageRecorder()
+    previous_sink = instrumentation.set_sink(recorder)
+    profiler = None
+    if args.profile_mode == "cprofile":
+        profiler = cProfile.Profile()
+        profiler.enable()
+    elif args.profile_mode == "tracemalloc":
+        tracemalloc.start(25)
+
+    try:
+        yield
+    finally:
+        instrumentation.set_sink(previous_sink)
+        print("\nStage breakdown:")
+        print(recorder.format_report())
+        recorder.save(args.profile_output)
+        print(f"Stage metrics written to {args.profile_output}")
+
+        if profiler is not None:
+            profiler.disable()
+            stats_path = args.profile_output.rsplit(".", 1)[0] + ".prof"
+            profiler.dump_stats(stats_path)
+            print(f"\ncProfile stats written to {stats_path}; top functions by cumulative time:")
+            pstats.Stats(profiler).sort_stats("cumulative").print_stats(20)
+        elif tracemalloc.is_tracing():
+            snapshot = tracemalloc.take_snapshot()
+            _, peak = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+            print(f"\nPeak traced memory: {peak / 1024 / 1024:.1f} MiB; top allocation sites:")
+            for stat in snapshot.statistics("lineno")[:20]:
+                print(f"  {stat}")
+
+
+def run_batch(creator: UoCCreator, unit_codes: list, additional_details: dict, args,
+              qualifications: bool = False, bundle=None) -> int:
+    """Prepare a batch of units, or every unit of some qualifications, reporting the outcome of each one"""
+
+    def report(unit_code, error):
+        if error is None:
+            print(f"[ok]     {unit_code}")
+        else:
+            print(f"[failed] {unit_code}: {error}", file=sys.stderr)
+
+    prepare = creator.prepare_qualifications if qualifications else creator.prepare_units
+    results = prepare(
+        unit_codes,
+        additional_details,
+        jobs=args.jobs or 1,
+        fetch_workers=args.fetch_workers,
+        on_result=report,
+        force=args.force,
+        bundle=bundle,
+    )
+    failed = [code for code, error in results.items() if error is not None]
+    print(f"Prepared {len(results) - len(failed)} of {len(results)} units")
+    if failed:
+        print(f"Failed: {', '.join(failed)}", file=sys.stderr)
+        return 1
+    return 0
+
+
+def run_service(client, unit_codes: list, additional_details: dict, args) -> int:
+    """Send units to a running render service and wait for each one, reporting its outcome"""
+
+    def report(job):
+        if job["status"] == "done":
+            print(f"[ok]     {job['unit_code']} ({job['seconds']:.2f}s)")
+        else:
+            print(f"[failed] {job['unit_code']}: {job['error']}", file=sys.stderr)
+
+    jobs = client.submit(unit_codes, additional_details, force=args.force)
+    print(f"Queued {len(jobs)} units on {client.url}")
+    results = client.wait(jobs, on_result=report)
+    failed = [job["unit_code"] for job in results.values() if job["status"] != "done"]
+    print(f"Prepared {len(results) - len(failed)} of {len(results)} units")
+    if failed:
+        print(f"Failed: {', '.join(failed)}", file=sys.stderr)
+        return 1
+    return 0
 
 
 def main():
@@ -20,6 +151,149 @@ def main():
     parser.add_argument(
         "--unit-code", type=str, help="Unit of Competency code to process"
     )
+    parser.add_argument(
+        "--unit-codes", nargs="+", metavar="CODE", help="Several unit codes to process as a batch"
+    )
+    parser.add_argument(
+        "--unit-file",
+        type=str,
+        metavar="PATH",
+        help="File of unit codes to process as a batch ('-' reads stdin)",
+    )
+    parser.add_argument(
+        "--qualification",
+        nargs="+",
+        metavar="CODE",
+        help="Qualification codes whose core and elective units are all processed, "
+        "using each qualification's code and title",
+    )
+    parser.add_argument(
+        "--jobs",
+        type=int,
+        default=None,
+        help="Number of documents to render in parallel (batch mode, default: 1), "
+        "or of processes parsing exports (--ingest, default: one per CPU)",
+    )
+    parser.add_argument(
+        "--bundle",
+        type=str,
+        metavar="PATH",
+        help="Write every document and details JSON into this zip archive instead of the Units folder",
+    )
+    parser.add_argument(
+        "--fetch-workers",
+        type=int,
+        default=8,
+        help="Number of units to fetch concurrently (batch mode)",
+    )
+    parser.add_argument(
+        "--serve",
+        action="store_true",
+        help="Run a render service on localhost with --jobs warm worker processes",
+    )
+    parser.add_argument(
+        "--host",
+        type=str,
+        default="127.0.0.1",
+        help="Address the render service listens on (default: 127.0.0.1; any other address needs --token)",
+    )
+    parser.add_argument(
+        "--port", type=int, default=8642, help="Port the render service listens on (default: 8642)"
+    )
+    parser.add_argument(
+        "--service",
+        type=str,
+        nargs="?",
+        const="http://127.0.0.1:8642",
+        metavar="URL",
+        help="Send units to a running render service instead of preparing them here "
+        "(default: http://127.0.0.1:8642)",
+    )
+    parser.add_argument(
+        "--token",
+        type=str,
+        default=os.environ.get("UOC_SERVICE_TOKEN"),
+        help="Token the render service requires, and --service sends (default: $UOC_SERVICE_TOKEN)",
+    )
+    parser.add_argument(
+        "--service-metrics",
+        action="store_true",
+        help="Print the queue depth and throughput of a running render service",
+    )
+    parser.add_argument(
+        "--no-cache", action="store_true", help="Bypass the training.gov.au XML cache"
+    )
+    parser.add_argument(
+        "--purge-cache", action="store_true", help="Remove all cached training.gov.au XML and known releases"
+    )
+    parser.add_argument(
+        "--offline",
+        action="store_true",
+        help="Use only cached training.gov.au XML and known releases, never the network",
+    )
+    parser.add_argument(
+        "--cache-ttl",
+        type=float,
+        default=XMLCache.DEFAULT_TTL,
+        metavar="SECONDS",
+        help="Serve cached XML and known releases without revalidation for this long (default: one day)",
+    )
+    parser.add_argument(
+        "--ingest",
+        type=str,
+        metavar="PATH",
+        help="Load a directory or zip of unit XML exports into the local unit store "
+        "(parsed on --jobs processes, default: one per CPU)",
+    )
+    parser.add_argument(
+        "--from-store",
+        action="store_true",
+        help="Read unit data from the local unit store instead of training.gov.au",
+    )
+    parser.add_argument(
+        "--store",
+        type=str,
+        metavar="PATH",
+        help="Unit store database (default: Cache/units.db)",
+    )
+    parser.add_argument(
+        "--search",
+        type=str,
+        metavar="QUERY",
+        help="Search the elements, criteria, skills and evidence of prepared units",
+    )
+    parser.add_argument(
+        "--search-limit", type=int, default=20, metavar="N", help="Maximum search results (default: 20)"
+    )
+    parser.add_argument(
+        "--reindex",
+        action="store_true",
+        help="Add every saved unit details file to the search index",
+    )
+    parser.add_argument(
+        "--force",
+        action="store_true",
+        help="Regenerate outputs even if their inputs are unchanged "
+        "(with --setup-templates, download every template again)",
+    )
+    parser.add_argument(
+        "--profile",
+        action="store_true",
+        help="Print a per-unit stage breakdown and write stage metrics as JSON",
+    )
+    parser.add_argument(
+        "--profile-output",
+        type=str,
+        default="profile.json",
+        metavar="PATH",
+        help="File for --profile stage metrics (default: profile.json)",
+    )
+    parser.add_argument(
+        "--profile-mode",
+        choices=["cprofile", "tracemalloc"],
+        help="Also capture a cProfile or tracemalloc profile with --profile "
+        "(these only see the main process, so combine with --jobs 1)",
+    )
     parser.add_argument("--course-code", type=str, help="Course code (optional)")
     parser.add_argument("--course-title", type=str, help="Course title (optional)")
     parser.add_argument(
@@ -34,27 +308,121 @@ def main():
             print(f"Successfully prepared documentation for {creator.unit_code}")
             return 0
 
+        if args.no_cache and args.offline:
+            parser.error("--offline cannot be combined with --no-cache")
+
+        unit_codes = list(args.unit_codes or [])
+        if args.unit_file:
+            unit_codes.extend(read_unit_codes(args.unit_file))
+        batch = bool(unit_codes)
+        if args.unit_code:
+            unit_codes.insert(0, args.unit_code)
+
+        # Create a dictionary of optional details, filtering out empty values.
+        additional_details = {
+            k: v
+            for k, v in {
+                "course_code": args.course_code,
+                "course_title": args.course_title,
+            }.items()
+            if v
+        }
+
+        if args.serve:
+            from src.render_service import serve
+
+            def ready(address):
+                print(f"Render service listening on http://{address[0]}:{address[1]} "
+                      f"with {max(1, args.jobs or 1)} warm workers")
+
+            try:
+                serve(args.host, args.port, workers=args.jobs or 1, sources=source_options(args), ready=ready,
+                      token=args.token)
+            except KeyboardInterrupt:
+                pass
+            return 0
+
+        if args.service or args.service_metrics:
+            if args.qualification or args.bundle:
+                parser.error("--service cannot be combined with --qualification or --bundle")
+            if not unit_codes and not args.service_metrics:
+                parser.error("--service needs unit codes to send")
+            from src.render_service import RenderClient
+            client = RenderClient(args.service or "http://127.0.0.1:8642", token=args.token)
+            status = 0
+            if unit_codes:
+                status = run_service(client, unit_codes, additional_details, args)
+            if args.service_metrics:
+                for name, value in client.metrics().items():
+                    print(f"{name:<18} {value}")
+            return status
+
+        if args.reindex:
+            updated = UoCCreator.search_index.index_unit_files()
+            print(f"Search index updated for {updated} units")
+        if args.search:
+            results = UoCCreator.search_index.search(args.search, limit=args.search_limit)
+            for result in results:
+                print(f"{result['unit_code']}  {result['section']} {result['ref']}: {result['text']}")
+            if not results:
+                print("No matches")
+
+        if unit_codes or args.qualification or args.purge_cache or args.ingest or args.from_store:
+            UoCData = configure_sources(args)
+        if args.purge_cache:
+            UoCData.cache.purge()
+            UoCData.releases.purge()
+            print("Cache purged")
+
+        ingest_failed = False
+        if args.ingest:
+            from src.unit_store import UnitStore, ingest
+            result = ingest(args.ingest, UnitStore(args.store), workers=args.jobs)
+            print(f"Ingested {result['ingested']} units into the unit store")
+            for export, error in result['failed'].items():
+                print(f"  failed: {export}: {error}", file=sys.stderr)
+            ingest_failed = bool(result['failed'])
+
         # Handle template setup and/or unit creation mode.
-        if args.unit_code or args.setup_templates:
+        if unit_codes or args.qualification or args.setup_templates:
             creator = UoCCreator()
 
             if args.setup_templates:
-                creator.setup_templates()
-                print("Templates downloaded successfully")
-
-            if args.unit_code:
-                # Create a dictionary of optional details, filtering out empty values.
-                additional_details = {
-                    k: v
-                    for k, v in {
-                        "course_code": args.course_code,
-                        "course_title": args.course_title,
-                    }.items()
-                    if v
-                }
-                creator.prepare_unit(args.unit_code, additional_details)
-                print(f"Successfully prepared documentation for {args.unit_code}")
-            return 0
+                result = creator.setup_templates(force_download=args.force)
+                if args.force:
+                    print(f"Downloaded {len(result)} templates")
+                else:
+                    print(
+                        f"Templates synced: {len(result['updated'])} updated, "
+                        f"{len(result['unchanged'])} unchanged, {len(result['failed'])} failed"
+                    )
+                    for file_name in result['updated']:
+                        print(f"  updated: {file_name}")
+                    for file_name, error in result['failed'].items():
+                        print(f"  failed: {file_name}: {error}", file=sys.stderr)
+
+            status = 0
+            with profile_session(args), ExitStack() as stack:
+                bundle = None
+                if args.bundle and (args.qualification or unit_codes):
+                    from src.bundle import BundleWriter
+                    bundle = stack.enter_context(BundleWriter(args.bundle))
+
+                if args.qualification:
+                    status = run_batch(creator, args.qualification, additional_details, args,
+                                       qualifications=True, bundle=bundle)
+
+                if batch or (unit_codes and bundle is not None):
+                    status = max(status, run_batch(creator, unit_codes, additional_details, args, bundle=bundle))
+                elif unit_codes:
+                    creator.prepare_unit(unit_codes[0], additional_details, force=args.force)
+                    print(f"Successfully prepared documentation for {unit_codes[0]}")
+            if bundle is not None:
+                print(f"Wrote {len(bundle.names)} files to {args.bundle}")
+            return status
+
+        if args.purge_cache or args.ingest or args.search or args.reindex:
+            return 1 if ingest_failed else 0
 
         # If no valid combination of arguments is provided, show help.
         parser.print_help()